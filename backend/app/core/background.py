@@ -0,0 +1,36 @@
+"""
+Background task tracking for Ignacio Bot
+Keeps fire-and-forget work referenced while it runs and lets shutdown wait for it
+"""
+
+import asyncio
+from collections.abc import Coroutine
+from typing import Any
+
+# Strong references so running tasks aren't garbage collected
+_pending_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(coro: Coroutine[Any, Any, Any], description: str) -> asyncio.Task:
+    """Schedule work that the caller doesn't wait for; failures are logged"""
+    task = asyncio.create_task(coro)
+    _pending_tasks.add(task)
+    task.add_done_callback(lambda finished: _on_task_done(finished, description))
+    return task
+
+
+def _on_task_done(task: asyncio.Task, description: str) -> None:
+    _pending_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[BACKGROUND] {description} failed: {task.exception()}")
+
+
+async def drain_background_tasks(timeout: float = 10.0) -> None:
+    """Wait for pending background work (e.g. message writes) before shutdown"""
+    if not _pending_tasks:
+        return
+
+    print(f"[BACKGROUND] Waiting for {len(_pending_tasks)} background task(s)")
+    _, still_pending = await asyncio.wait(set(_pending_tasks), timeout=timeout)
+    if still_pending:
+        print(f"[BACKGROUND] {len(still_pending)} background task(s) did not finish before shutdown")
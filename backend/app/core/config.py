@@ -26,6 +26,12 @@ class Settings(BaseSettings):
 
     # OpenAI
     openai_api_key: str
+    openai_max_connections: int = 200
+    # Only applies to the httpx transport; aiohttp doesn't cap idle connections
+    openai_max_keepalive_connections: int = 100
+    openai_http_transport: str = "httpx"
+    # File uploads to OpenAI in flight at once across the process
+    openai_max_concurrent_uploads: int = 8
 
     # WhatsApp
     whatsapp_access_token: str = ""
@@ -63,6 +69,14 @@ class Settings(BaseSettings):
     uvicorn_workers: int = 1
     uvicorn_max_requests: int = 1000
     uvicorn_max_requests_jitter: int = 50
+    # Worker threads for blocking Supabase calls (database and storage)
+    io_thread_pool_size: int = 64
+
+    # Semantic response cache
+    # Off by default: every turn without files pays an embeddings call first
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_ttl: int = 3600
 
     # Health Check
     health_check_interval: int = 30
@@ -0,0 +1,39 @@
+import httpx
+from agents import set_default_openai_client
+from openai import AsyncOpenAI, DefaultAioHttpClient
+
+from app.core.config import settings
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Create the pooled HTTP client for the configured transport"""
+    limits = httpx.Limits(
+        max_keepalive_connections=settings.openai_max_keepalive_connections,
+        max_connections=settings.openai_max_connections,
+    )
+    timeout = httpx.Timeout(600.0, connect=5.0)
+
+    if settings.openai_http_transport == "aiohttp":
+        # aiohttp keeps scaling where httpcore's pool contends at high
+        # concurrency (HTTP/1.1 only; needs the `openai[aiohttp]` extra).
+        # max_connections becomes the aiohttp connector's limit; aiohttp has
+        # no cap on idle connections, so max_keepalive_connections is unused.
+        return DefaultAioHttpClient(limits=limits, timeout=timeout)
+    return httpx.AsyncClient(http2=True, limits=limits, timeout=timeout)
+
+
+# One pooled connection pool for every OpenAI call in the process (agent
+# runs, titles, uploads, summaries, embeddings), so TLS connections are
+# reused instead of each client owning its own pool
+http_client = _build_http_client()
+
+# Create OpenAI client
+openai_client = AsyncOpenAI(http_client=http_client)
+
+# The Agents SDK uses the shared client for Runner.run as well
+set_default_openai_client(openai_client)
+
+
+async def close_openai_client() -> None:
+    """Close pooled OpenAI connections on shutdown"""
+    await http_client.aclose()
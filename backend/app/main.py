@@ -1,4 +1,12 @@
+import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
@@ -26,9 +34,6 @@ env_path = get_env_file_path()
 load_dotenv(env_path)
 
 # Configure logging
-import logging
-import sys
-
 def configure_logging():
     """Configure application logging based on settings."""
     from app.core.config import settings
@@ -36,14 +41,26 @@ def configure_logging():
     # Set log level
     log_level = getattr(logging, settings.log_level.upper(), logging.INFO)
 
+    # Log records are only queued on the request path; a listener thread
+    # formats them and does the blocking stdout writes
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s' if settings.log_format == 'text'
+        else '{"timestamp": "%(asctime)s", "name": "%(name)s", "level": "%(levelname)s", "message": "%(message)s"}'
+    ))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    # The queue handler only merges the message; layout is the stream handler's job
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
     # Configure root logger
     logging.basicConfig(
         level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s' if settings.log_format == 'text'
-               else '{"timestamp": "%(asctime)s", "name": "%(name)s", "level": "%(levelname)s", "message": "%(message)s"}',
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
+        handlers=[queue_handler]
     )
 
     # Set uvicorn logging level
@@ -67,8 +84,33 @@ if 'OPENAI_API_KEY' not in os.environ and hasattr(os.environ, 'get'):
     if temp_settings.openai_api_key:
         os.environ['OPENAI_API_KEY'] = temp_settings.openai_api_key
 
-from app.core.config import settings
-from app.routers import chat, files, health, project, prompt_templates, users
+# App modules read settings at import, so they load after the .env file
+from app.core.background import drain_background_tasks  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.openai_client import close_openai_client  # noqa: E402
+from app.routers import (  # noqa: E402
+    chat,
+    files,
+    health,
+    project,
+    prompt_templates,
+    users,
+)
+from app.services.ai_service import warmup as warmup_ai_service  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the agent service before the first request; flush background writes on shutdown"""
+    # Supabase calls run in the loop's default executor (asyncio.to_thread)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.io_thread_pool_size, thread_name_prefix="io")
+    )
+    await warmup_ai_service()
+    yield
+    await drain_background_tasks()
+    await close_openai_client()
+
 
 # Create FastAPI application
 app = FastAPI(
@@ -76,6 +118,7 @@ app = FastAPI(
     description="API for Ignacio, a chat assistant that helps users develop their projects as part of the Action Lab education program",
     version="1.0.0",
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -117,6 +117,8 @@ class MessageBase(BaseModel):
     is_from_user: bool
     whatsapp_message_id: str | None = None
     attachments: List[UUID] = []  # List of file IDs attached to this message
+    is_summary: bool = False  # Condenser-generated summary of earlier messages
+    condensed: bool = False  # Folded into a summary, no longer replayed to the agent
 
 
 class Message(MessageBase):
@@ -131,6 +133,9 @@ class Message(MessageBase):
 class MessageCreate(MessageBase):
     conversation_id: UUID
     user_id: UUID
+    # Set when the caller needs the row's identity before the insert completes
+    id: UUID | None = None
+    created_at: datetime | None = None
 
 
 class UserSessionBase(BaseModel):
@@ -293,6 +298,17 @@ class ConversationResult(BaseModel):
     suggested_actions: List[str] = []
     requires_followup: bool = False
     execution_time_ms: int = 0
+    message: Message | None = None  # The AI reply as stored
+
+
+class ConversationTurnBundle(BaseModel):
+    """Everything needed to run one conversation turn, loaded in a single query"""
+    conversation: Conversation
+    user_name: str | None = None
+    project: Project | None = None
+    summary: str | None = None  # Latest summary of condensed earlier messages
+    recent_messages: List[Message] = []
+    message_count: int = 0
 
 
 class FileIntegrationResult(BaseModel):
@@ -3,6 +3,8 @@ Chat API endpoints for Ignacio Bot
 Handles conversations and messages with Auth0 JWT authentication
 """
 
+import asyncio
+from datetime import datetime
 from uuid import UUID
 from typing import List
 
@@ -13,7 +15,7 @@ from app.auth.dependencies import get_current_active_user
 from app.auth.models import AuthUser
 
 from app.models.database import ConversationUpdate, MessageType
-from app.services.ai_service import get_ignacio_service
+from app.services.ai_service import ContextBudgetExceededError, get_ignacio_service
 from app.services.database import db_service
 from app.services.storage import storage_service
 
@@ -72,24 +74,22 @@ class AgentMessageResponse(BaseModel):
 async def get_conversations(current_user: AuthUser = Depends(get_current_active_user)):
     """Get all conversations for a given user"""
     try:
-        conversations = await db_service.get_user_conversations(current_user.id)
-
-        # Get message count for each conversation
-        result = []
-        for conv in conversations:
-            messages = await db_service.get_conversation_messages(conv.id)
-            result.append(
-                ConversationResponse(
-                    id=conv.id,
-                    title=conv.title,
-                    project_id=conv.project_id,
-                    created_at=conv.created_at.isoformat(),
-                    updated_at=conv.updated_at.isoformat(),
-                    message_count=len(messages),
-                )
-            )
+        # Message counts come back with the conversations (no per-conversation fetch)
+        conversations = await db_service.get_user_conversations_with_message_counts(
+            current_user.id
+        )
 
-        return result
+        return [
+            ConversationResponse(
+                id=conv.id,
+                title=conv.title,
+                project_id=conv.project_id,
+                created_at=conv.created_at.isoformat(),
+                updated_at=conv.updated_at.isoformat(),
+                message_count=message_count,
+            )
+            for conv, message_count in conversations
+        ]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -165,7 +165,7 @@ async def update_conversation(
             title=request.title, project_id=request.project_id
         )
         updated_conv = await db_service.update_conversation(
-            conversation_id, update_data
+            conversation_id, update_data, current=conversation
         )
 
         if not updated_conv:
@@ -227,9 +227,11 @@ async def get_messages(
     conversation_id: UUID,
     limit: int = 50,
     offset: int = 0,
+    after: datetime | None = None,
+    after_id: UUID | None = None,
     current_user: AuthUser = Depends(get_current_active_user),
 ):
-    """Get messages for a conversation"""
+    """Get messages for a conversation (use `after`/`after_id` with the last message's created_at/id to page)"""
     try:
         # Check if conversation exists
         conversation = await db_service.get_conversation_by_id(conversation_id)
@@ -239,7 +241,11 @@ async def get_messages(
             )
 
         messages = await db_service.get_conversation_messages(
-            conversation_id, limit=limit, offset=offset
+            conversation_id,
+            limit=limit,
+            offset=offset,
+            after=after,
+            after_id=after_id,
         )
 
         return [
@@ -331,14 +337,14 @@ async def associate_conversation_with_project(
         if not project_id:
             raise HTTPException(status_code=400, detail="project_id is required")
 
-        # Check if conversation exists
-        conversation = await db_service.get_conversation_by_id(conversation_id)
-        if not conversation:
+        # Check that both the conversation and the project exist
+        conversation_exists, project_exists = await asyncio.gather(
+            db_service.conversation_exists(conversation_id),
+            db_service.project_exists(UUID(project_id)),
+        )
+        if not conversation_exists:
             raise HTTPException(status_code=404, detail="Conversation not found")
-
-        # Check if project exists
-        project = await db_service.get_project_by_id(UUID(project_id))
-        if not project:
+        if not project_exists:
             raise HTTPException(status_code=404, detail="Project not found")
 
         # Update conversation with project association
@@ -443,7 +449,7 @@ async def send_message_unified(
             # Prepare file content data from existing file
             try:
                 file_content = await storage_service.download_file(
-                    existing_file_uuid, current_user.id
+                    existing_file_uuid, current_user.id, file_record=existing_file_record
                 )
                 if file_content is None:
                     raise HTTPException(
@@ -562,6 +568,12 @@ async def send_message_unified(
                     file_contents=file_content_data if file_content_data else None,
                 )
                 print("[CHAT] Agent SDK processing completed successfully")
+            except ContextBudgetExceededError as e:
+                print(f"[CHAT] ERROR: Message too large for the model: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=str(e),
+                ) from e
             except Exception as e:
                 print("[CHAT] ERROR: Agent SDK processing failed: {str(e)}")
                 raise HTTPException(
@@ -601,6 +613,12 @@ async def send_message_unified(
                     file_contents=file_content_data if file_content_data else None,
                 )
                 print("[CHAT] Agent SDK conversation started successfully")
+            except ContextBudgetExceededError as e:
+                print(f"[CHAT] ERROR: Message too large for the model: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=str(e),
+                ) from e
             except Exception as e:
                 print(f"[CHAT] ERROR: Agent SDK conversation start failed: {str(e)}")
                 raise HTTPException(
@@ -610,14 +628,16 @@ async def send_message_unified(
             # Handle file-conversation relationships after conversation creation
             if hasattr(agent_result, "conversation_id"):
                 if uploaded_file:
-                    # Update the uploaded file record with the conversation_id
-                    await db_service.update_user_file(
-                        uploaded_file.id,
-                        {"conversation_id": str(agent_result.conversation_id)},
-                    )
-                    # Add file-conversation relationship for new uploads
-                    await db_service.add_file_to_conversation(
-                        uploaded_file.id, agent_result.conversation_id
+                    # Set the uploaded file's conversation_id and add the
+                    # file-conversation relationship (independent writes)
+                    await asyncio.gather(
+                        db_service.update_user_file(
+                            uploaded_file.id,
+                            {"conversation_id": str(agent_result.conversation_id)},
+                        ),
+                        db_service.add_file_to_conversation(
+                            uploaded_file.id, agent_result.conversation_id
+                        ),
                     )
                 elif existing_file_record:
                     # Link existing file to the new conversation
@@ -638,25 +658,8 @@ async def send_message_unified(
                         # Don't fail the whole request if file linking fails
                         pass
 
-        # Handle the case where agent_result might be a dict due to an error
-        conversation_id_result = None
-        if hasattr(agent_result, "conversation_id"):
-            conversation_id_result = agent_result.conversation_id
-        elif isinstance(agent_result, dict) and "conversation_id" in agent_result:
-            conversation_id_result = agent_result["conversation_id"]
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Invalid agent result format: {type(agent_result)}",
-            )
-
-        # Get the AI response message
-        messages = await db_service.get_conversation_messages(conversation_id_result)
-        ai_message = None
-        for msg in reversed(messages):
-            if not msg.is_from_user:
-                ai_message = msg
-                break
+        # The stored AI response message comes back with the result
+        ai_message = agent_result.message
 
         if not ai_message:
             raise HTTPException(
@@ -165,7 +165,9 @@ async def download_file(file_id: str, current_user: AuthUser = Depends(get_curre
             raise HTTPException(status_code=403, detail="Access denied")
 
         # Download file content
-        file_content = await storage_service.download_file(file_uuid, user_uuid)
+        file_content = await storage_service.download_file(
+            file_uuid, user_uuid, file_record=file_record
+        )
 
         if file_content is None:
             raise HTTPException(status_code=404, detail="File content not found")
@@ -393,13 +395,14 @@ async def reuse_file(file_id: str, conversation_id: str, current_user: AuthUser
     try:
         from app.services.database import db_service
 
-        # Verify user owns the file
-        file_record = await db_service.get_file_by_id(file_uuid)
+        # Verify user owns the file and the conversation
+        file_record, conversation = await asyncio.gather(
+            db_service.get_file_by_id(file_uuid),
+            db_service.get_conversation_by_id(conv_uuid),
+        )
         if not file_record or file_record.user_id != user_uuid:
             raise HTTPException(status_code=403, detail="Access denied")
 
-        # Verify user owns the conversation
-        conversation = await db_service.get_conversation_by_id(conv_uuid)
         if not conversation or conversation.user_id != user_uuid:
             raise HTTPException(status_code=403, detail="Access denied to conversation")
 
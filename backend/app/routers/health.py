@@ -20,8 +20,8 @@ async def health_check():
             "version": "1.0.0",
         }
     except Exception as e:
-        print(e.with_traceback())
-        raise e
+        print(e)
+        raise
 
 
 
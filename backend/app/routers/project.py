@@ -198,8 +198,7 @@ async def get_project_conversations(project_id: UUID, current_user: AuthUser = D
     """Get all conversations for a specific project"""
     try:
         # Check if project exists
-        existing_project = await db_service.get_project_by_id(project_id)
-        if not existing_project:
+        if not await db_service.project_exists(project_id):
             raise HTTPException(status_code=404, detail="Project not found")
 
         # Get conversations for the project
@@ -265,8 +264,7 @@ async def update_project_context(project_id: UUID, context_data: dict, current_u
     """Update project context"""
     try:
         # Check if project exists
-        existing_project = await db_service.get_project_by_id(project_id)
-        if not existing_project:
+        if not await db_service.project_exists(project_id):
             raise HTTPException(status_code=404, detail="Project not found")
 
         # Update project context
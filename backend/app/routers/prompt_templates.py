@@ -130,7 +130,9 @@ async def update_prompt_template(
                 detail="You don't have permission to modify this template",
             )
 
-        template = await db_service.update_prompt_template(template_id, template_data)
+        template = await db_service.update_prompt_template(
+            template_id, template_data, current=existing_template
+        )
         if not template:
             raise HTTPException(
                 status_code=500, detail="Failed to update prompt template"
@@ -6,22 +6,36 @@ Includes project context integration for personalized conversations.
 """
 
 import asyncio
-import base64
+import hashlib
+import json
+import logging
+import math
+import textwrap
 import time
-from typing import Dict, List, Optional
-from uuid import UUID
+from datetime import datetime, timezone
+from functools import cache
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+from uuid import UUID, uuid4
 
 from agents import Agent, Runner, RunHooks, RunContextWrapper, Tool
-from openai import OpenAI
-from app.models.database import ConversationResult, MessageCreate, MessageType, UserFile
+from pybase64 import b64encode as _b64encode
+from pydantic import BaseModel
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.openai_client import openai_client
+from app.models.database import ConversationResult, Message, MessageCreate, MessageType, UserFile
+from app.services.conversation_condenser import conversation_condenser
 from app.services.database import db_service
 from app.services.project_context_service import (
     project_context_service, 
     ProjectContext, 
     create_project_aware_instructions
 )
+from app.services.response_cache import response_cache
 from app.services.storage import storage_service
 
+logger = logging.getLogger(__name__)
+
 
 class IgnacioRunHooks(RunHooks[ProjectContext]):
     """Custom lifecycle hooks for monitoring agent handoffs and operations"""
@@ -32,7 +46,7 @@ class IgnacioRunHooks(RunHooks[ProjectContext]):
         agent: Agent[ProjectContext]
     ) -> None:
         """Called when an agent starts processing"""
-        print(f"[AGENT_LIFECYCLE] 🚀 Agent started: {agent.name}")
+        logger.debug("[AGENT_LIFECYCLE] Agent started: %s", agent.name)
 
     async def on_agent_end(
         self,
@@ -41,7 +55,7 @@ class IgnacioRunHooks(RunHooks[ProjectContext]):
         output: str
     ) -> None:
         """Called when an agent finishes processing"""
-        print(f"[AGENT_LIFECYCLE] ✅ Agent completed: {agent.name} (output: {len(output)} chars)")
+        logger.debug("[AGENT_LIFECYCLE] Agent completed: %s (output: %d chars)", agent.name, len(output))
 
     async def on_handoff(
         self,
@@ -50,13 +64,13 @@ class IgnacioRunHooks(RunHooks[ProjectContext]):
         to_agent: Agent[ProjectContext]
     ) -> None:
         """Called when a handoff occurs between agents"""
-        user_info = f"User: {context.context.user_name or context.context.user_id}"
-        project_info = f"Project: {context.context.project_name or 'No project'}"
-
-        print(f"[AGENT_HANDOFF] 🔄 Handoff detected!")
-        print(f"[AGENT_HANDOFF]   From: {from_agent.name}")
-        print(f"[AGENT_HANDOFF]   To: {to_agent.name}")
-        print(f"[AGENT_HANDOFF]   Context: {user_info}, {project_info}")
+        logger.info(
+            "[AGENT_HANDOFF] %s -> %s (user: %s, project: %s)",
+            from_agent.name,
+            to_agent.name,
+            context.context.user_name or context.context.user_id,
+            context.context.project_name or "No project",
+        )
 
     async def on_tool_start(
         self,
@@ -65,12 +79,9 @@ class IgnacioRunHooks(RunHooks[ProjectContext]):
         tool: Tool
     ) -> None:
         """Called when a tool starts executing"""
-        # Get tool name for logging
-        tool_name = getattr(tool, 'name', str(tool))
-
         # Only log specialist agent tools (handoffs), not internal tools
-        if tool_name.endswith('_expert'):
-            print(f"[AGENT_TOOL] 🔧 {agent.name} calling specialist: {tool_name}")
+        if tool.name in _SPECIALIST_TOOL_NAMES:
+            logger.info("[AGENT_TOOL] %s calling specialist: %s", agent.name, tool.name)
 
     async def on_tool_end(
         self,
@@ -80,184 +91,427 @@ class IgnacioRunHooks(RunHooks[ProjectContext]):
         result: str
     ) -> None:
         """Called when a tool finishes executing"""
-        # Get tool name for logging
-        tool_name = getattr(tool, 'name', str(tool))
-
         # Only log specialist agent tools (handoffs), not internal tools
-        if tool_name.endswith('_expert'):
-            output_preview = result[:100] + "..." if len(result) > 100 else result
-            print(f"[AGENT_TOOL] ✅ {tool_name} completed for {agent.name}")
-            print(f"[AGENT_TOOL]   Output preview: {output_preview}")
+        if tool.name in _SPECIALIST_TOOL_NAMES:
+            logger.info("[AGENT_TOOL] %s completed for %s", tool.name, agent.name)
+            if logger.isEnabledFor(logging.DEBUG):
+                output_preview = result[:100] + "..." if len(result) > 100 else result
+                logger.debug("[AGENT_TOOL]   Output preview: %s", output_preview)
+
+
+# Specialist sub-agents: (domain, agent name, handoff description, tool name, tool description)
+_SPECIALISTS = (
+    (
+        "marketing",
+        "Marketing Expert",
+        "Marketing expert for market research, customer acquisition, and growth strategies",
+        "marketing_expert",
+        "Consult marketing specialist for market research, customer acquisition, and growth strategies",
+    ),
+    (
+        "technology",
+        "Technology Expert",
+        "Technology expert for tech stack selection, development, and architecture decisions",
+        "tech_expert",
+        "Consult technology specialist for tech decisions, development, and architecture",
+    ),
+    (
+        "finance",
+        "Finance Expert",
+        "Finance expert for business models, funding strategies, and financial planning",
+        "finance_expert",
+        "Consult finance specialist for business models, funding, and financial planning",
+    ),
+    (
+        "sustainability",
+        "Sustainability Expert",
+        "Sustainability expert for ESG strategies, impact measurement, and environmental considerations",
+        "sustainability_expert",
+        "Consult sustainability specialist for ESG strategies, impact measurement, and environmental considerations",
+    ),
+    (
+        "legal",
+        "Legal & Compliance Expert",
+        "Legal and compliance expert for business formation, contracts, and regulatory requirements",
+        "legal_expert",
+        "Consult legal and compliance specialist for business formation, contracts, and regulatory requirements",
+    ),
+    (
+        "operations",
+        "Operations Expert",
+        "Operations expert for process optimization, supply chain, and workflow automation",
+        "operations_expert",
+        "Consult operations specialist for process optimization, supply chain, and workflow automation",
+    ),
+    (
+        "product",
+        "Product & Design Expert",
+        "Product and design expert for UX/UI design, product development, and user research",
+        "product_expert",
+        "Consult product and design specialist for UX/UI design, product development, and user research",
+    ),
+    (
+        "sales",
+        "Sales Expert",
+        "Sales expert for sales strategy, pipeline management, and customer relationships",
+        "sales_expert",
+        "Consult sales specialist for sales strategy, pipeline management, and customer relationships",
+    ),
+)
 
 
-class IgnacioAgentService:
-    """Simple OpenAI Agent SDK-based service for Ignacio Bot"""
+# Tool names of the specialist agents, used by the run hooks to pick out handoffs
+_SPECIALIST_TOOL_NAMES = frozenset(specialist[3] for specialist in _SPECIALISTS)
 
-    def __init__(self):
-        self._setup_agents()
-        self.openai_client = OpenAI()
 
-    def _setup_agents(self):
-        """Create the main agent and sub-agents with project context awareness"""
-        print("[AI_SERVICE] Setting up agents with new domain-specific system...")
-
-        # Specialist sub-agents with project context and domain-specific instructions
-        print("[AI_SERVICE] Creating Marketing Expert agent...")
-        self.marketing_agent = project_context_service.create_project_aware_agent(
-            agent_name="Marketing Expert",
-            domain="marketing"
-        )
-        self.marketing_agent.handoff_description = "Marketing expert for market research, customer acquisition, and growth strategies"
+class IgnacioAgents(NamedTuple):
+    """The composed agent graph: entry agent plus specialists keyed by domain"""
+    ignacio_agent: Agent[ProjectContext]
+    specialist_agents: Dict[str, Agent[ProjectContext]]
 
-        print("[AI_SERVICE] Creating Technology Expert agent...")
-        self.tech_agent = project_context_service.create_project_aware_agent(
-            agent_name="Technology Expert",
-            domain="technology"
-        )
-        self.tech_agent.handoff_description = "Technology expert for tech stack selection, development, and architecture decisions"
 
-        print("[AI_SERVICE] Creating Finance Expert agent...")
-        self.finance_agent = project_context_service.create_project_aware_agent(
-            agent_name="Finance Expert",
-            domain="finance"
-        )
-        self.finance_agent.handoff_description = "Finance expert for business models, funding strategies, and financial planning"
+@cache
+def _build_agents() -> IgnacioAgents:
+    """Create the main agent and sub-agents with project context awareness.
 
-        # New specialist agents
-        print("[AI_SERVICE] Creating Sustainability Expert agent...")
-        self.sustainability_agent = project_context_service.create_project_aware_agent(
-            agent_name="Sustainability Expert",
-            domain="sustainability"
-        )
-        self.sustainability_agent.handoff_description = "Sustainability expert for ESG strategies, impact measurement, and environmental considerations"
+    Agents and their tool schemas don't depend on the request, so the graph
+    is built once per process and shared by every IgnacioAgentService.
+    """
+    print("[AI_SERVICE] Setting up agents with new domain-specific system...")
 
-        print("[AI_SERVICE] Creating Legal & Compliance Expert agent...")
-        self.legal_agent = project_context_service.create_project_aware_agent(
-            agent_name="Legal & Compliance Expert",
-            domain="legal"
+    specialist_agents = {}
+    specialist_tools = []
+    for domain, agent_name, handoff_description, tool_name, tool_description in _SPECIALISTS:
+        print(f"[AI_SERVICE] Creating {agent_name} agent...")
+        agent = project_context_service.create_project_aware_agent(
+            agent_name=agent_name,
+            domain=domain
         )
-        self.legal_agent.handoff_description = "Legal and compliance expert for business formation, contracts, and regulatory requirements"
-
-        print("[AI_SERVICE] Creating Operations Expert agent...")
-        self.operations_agent = project_context_service.create_project_aware_agent(
-            agent_name="Operations Expert",
-            domain="operations"
+        agent.handoff_description = handoff_description
+        specialist_agents[domain] = agent
+        specialist_tools.append(
+            agent.as_tool(tool_name=tool_name, tool_description=tool_description)
         )
-        self.operations_agent.handoff_description = "Operations expert for process optimization, supply chain, and workflow automation"
 
-        print("[AI_SERVICE] Creating Product & Design Expert agent...")
-        self.product_agent = project_context_service.create_project_aware_agent(
-            agent_name="Product & Design Expert",
-            domain="product"
-        )
-        self.product_agent.handoff_description = "Product and design expert for UX/UI design, product development, and user research"
+    # Main entry agent with sub-agents as tools and project context awareness
+    print(f"[AI_SERVICE] Creating main Ignacio agent with all {len(specialist_tools)} specialists...")
+    context_tools = project_context_service.get_context_tools()
+    all_tools = specialist_tools + context_tools
+    print(f"[AI_SERVICE] Main agent configured with {len(specialist_tools)} specialist tools and {len(context_tools)} context tools")
+
+    ignacio_agent = Agent[ProjectContext](
+        name="Ignacio",
+        instructions=create_project_aware_instructions,
+        tools=all_tools
+    )
+
+    print(f"[AI_SERVICE] Agent setup complete! Main agent '{ignacio_agent.name}' ready with {len(all_tools)} total tools")
+    return IgnacioAgents(ignacio_agent=ignacio_agent, specialist_agents=specialist_agents)
+
+
+# Chunks go through pybase64's SIMD encoder, several times faster than the
+# stdlib on multi-MB files. A multiple of 3, so every chunk but the last
+# encodes without padding.
+_BASE64_CHUNK_BYTES = 48 * 1024
+
+
+# Data URL headers for the MIME types uploads actually use
+_DATA_URL_PREFIXES: Dict[str, bytes] = {
+    mime_type: f"data:{mime_type};base64,".encode("ascii")
+    for mime_type in (
+        "image/png", "image/jpeg", "image/gif", "image/webp", "application/pdf",
+    )
+}
+
+
+def _base64_data_url(file_type: str, file_content: bytes) -> str:
+    """Build a base64 data URL by encoding in chunks into one preallocated buffer"""
+    header = _DATA_URL_PREFIXES.get(file_type) or b"data:" + file_type.encode("ascii") + b";base64,"
+    data_url = bytearray(len(header) + (len(file_content) + 2) // 3 * 4)
+    data_url[:len(header)] = header
+
+    # Encoding chunk by chunk never holds a full-size encoded copy besides the
+    # output buffer, and keeps each encode's working set in cache
+    source = memoryview(file_content)
+    position = len(header)
+    for start in range(0, len(source), _BASE64_CHUNK_BYTES):
+        encoded = _b64encode(source[start:start + _BASE64_CHUNK_BYTES])
+        data_url[position:position + len(encoded)] = encoded
+        position += len(encoded)
+    return data_url.decode("ascii")
+
+
+def _image_input(file_content: bytes, file_name: str, file_type: str, file_id: str | None) -> dict:
+    # Images are inlined with base64 encoding
+    return {
+        "type": "input_image",
+        "image_url": _base64_data_url(file_type, file_content)
+    }
+
+
+def _document_input(file_content: bytes, file_name: str, file_type: str, file_id: str | None) -> dict:
+    if file_id:
+        # Reference documents by OpenAI file id instead of inlining them as base64
+        return {
+            "type": "input_file",
+            "file_id": file_id
+        }
 
-        print("[AI_SERVICE] Creating Sales Expert agent...")
-        self.sales_agent = project_context_service.create_project_aware_agent(
-            agent_name="Sales Expert",
-            domain="sales"
-        )
-        self.sales_agent.handoff_description = "Sales expert for sales strategy, pipeline management, and customer relationships"
-
-        # Main entry agent with sub-agents as tools and project context awareness
-        print("[AI_SERVICE] Creating main Ignacio agent with all 8 specialists...")
-        context_tools = project_context_service.get_context_tools()
-        specialist_tools = [
-                self.marketing_agent.as_tool(
-                    tool_name="marketing_expert",
-                    tool_description="Consult marketing specialist for market research, customer acquisition, and growth strategies"
-                ),
-                self.tech_agent.as_tool(
-                    tool_name="tech_expert",
-                    tool_description="Consult technology specialist for tech decisions, development, and architecture"
-                ),
-                self.finance_agent.as_tool(
-                    tool_name="finance_expert",
-                    tool_description="Consult finance specialist for business models, funding, and financial planning"
-                ),
-                self.sustainability_agent.as_tool(
-                    tool_name="sustainability_expert",
-                    tool_description="Consult sustainability specialist for ESG strategies, impact measurement, and environmental considerations"
-                ),
-                self.legal_agent.as_tool(
-                    tool_name="legal_expert",
-                    tool_description="Consult legal and compliance specialist for business formation, contracts, and regulatory requirements"
-                ),
-                self.operations_agent.as_tool(
-                    tool_name="operations_expert",
-                    tool_description="Consult operations specialist for process optimization, supply chain, and workflow automation"
-                ),
-                self.product_agent.as_tool(
-                    tool_name="product_expert",
-                    tool_description="Consult product and design specialist for UX/UI design, product development, and user research"
-                ),
-                self.sales_agent.as_tool(
-                    tool_name="sales_expert",
-                    tool_description="Consult sales specialist for sales strategy, pipeline management, and customer relationships"
-                )
-            ]
+    # Fallback: inline the document with base64 encoding
+    return {
+        "type": "input_file",
+        "filename": file_name,
+        "file_data": _base64_data_url(file_type, file_content)
+    }
+
+
+# Structured output schema for conversation titles
+_TITLE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "conversation_title",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"title": {"type": "string"}},
+            "required": ["title"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _fallback_title(initial_message: str) -> str:
+    """Truncate the first message into a title, on a word boundary unless the first word alone is too long"""
+    title = textwrap.shorten(initial_message, width=53, placeholder="...")
+    return title if title != "..." else f"{initial_message[:50]}..."
+
+
+# Messages this short are used verbatim as the title, skipping the model call
+_SHORT_TITLE_MAX_WORDS = 6
+_SHORT_TITLE_MAX_CHARS = 60
+
+
+# Rough token estimates; the guard only needs to be conservative, not exact
+_CHARS_PER_TOKEN = 4
+_IMAGE_TOKEN_ESTIMATE = 1105  # high-detail 1024x1024 image
+# Documents sent by file id are read as extracted text plus an image of each
+# page; one token per 64 bytes of file sits between text-only and scanned PDFs
+_FILE_BYTES_PER_TOKEN = 64
+
+
+class ContextBudgetExceededError(ValueError):
+    """The new turn alone doesn't fit in the model's context budget"""
+
+
+def _estimate_content_tokens(content: str | List[dict], file_sizes: Dict[str, int] | None = None) -> int:
+    """Estimate the prompt tokens of a message's content (text or Agent SDK input items)
+
+    `file_sizes` maps the OpenAI file ids referenced in the content to their size in bytes.
+    """
+    if isinstance(content, str):
+        return math.ceil(len(content) / _CHARS_PER_TOKEN)
+
+    tokens = 0
+    for item in content:
+        item_type = item.get("type")
+        if item_type == "input_text":
+            tokens += math.ceil(len(item["text"]) / _CHARS_PER_TOKEN)
+        elif item_type == "input_image":
+            tokens += _IMAGE_TOKEN_ESTIMATE
+        elif item_type == "input_file" and "file_data" in item:
+            # Inline base64 payload (~4/3 of the file size)
+            tokens += math.ceil(len(item["file_data"]) / _CHARS_PER_TOKEN)
+        elif item_type == "input_file" and file_sizes:
+            tokens += math.ceil(file_sizes.get(item["file_id"], 0) / _FILE_BYTES_PER_TOKEN)
+    return tokens
+
+
+# Files above this size are base64-encoded in a worker thread
+_INLINE_ENCODE_MAX_BYTES = 256 * 1024
+
+# Caps OpenAI file uploads in flight across all turns, so attachment bursts
+# queue here instead of tripping rate limits and the SDK's retry backoff
+_UPLOAD_SEMAPHORE = asyncio.Semaphore(settings.openai_max_concurrent_uploads)
+
+# After this many consecutive upload failures, documents go inline without
+# trying OpenAI file storage until the cool-down (seconds) has passed
+_UPLOAD_FAILURE_THRESHOLD = 3
+_UPLOAD_COOLDOWN_SECONDS = 60
+
+# Uploaded documents are reused for a day, and OpenAI deletes them an hour
+# after that, so a cached file id never outlives its file and copies don't
+# pile up in file storage (files are only referenced by the turn they're in)
+_UPLOADED_FILE_CACHE_SECONDS = 24 * 60 * 60
+_UPLOADED_FILE_EXPIRY_SECONDS = _UPLOADED_FILE_CACHE_SECONDS + 60 * 60
+
+# Documents sent as input_file (uploaded to OpenAI file storage when possible)
+_DOCUMENT_MIME_TYPES: frozenset[str] = frozenset({'application/pdf'})
+
+# MIME type (or "<major>/*" wildcard) -> Agent SDK input builder
+_FILE_INPUT_BUILDERS: Dict[str, Callable[[bytes, str, str, str | None], dict]] = {
+    'image/*': _image_input,
+    **{mime_type: _document_input for mime_type in _DOCUMENT_MIME_TYPES},
+}
+
+
+class ContextOptions(BaseModel):
+    """Controls how much conversation history is replayed to the agent.
+
+    The history window always starts at a multiple of
+    ``recent_message_cache_buffer``, so the prompt prefix (instructions +
+    replayed turns) stays byte-identical for several turns in a row and the
+    provider's prompt cache keeps hitting. The window holds between
+    ``recent_messages`` and ``recent_messages + recent_message_cache_buffer - 1``
+    messages.
+
+    Once a conversation reaches ``recent_messages + recent_message_cache_buffer``
+    messages, everything but the last ``recent_messages`` is condensed into a
+    summary that is replayed ahead of the window.
+    """
+    recent_messages: int = 20
+    recent_message_cache_buffer: int = 5
+    # Upper bound on the estimated prompt size (history + new turn)
+    context_window_tokens: int = 128_000
+    context_budget_ratio: float = 0.9
 
-        all_tools = specialist_tools + context_tools
-        print(f"[AI_SERVICE] Main agent configured with {len(specialist_tools)} specialist tools and {len(context_tools)} context tools")
 
-        self.ignacio_agent = Agent[ProjectContext](
-            name="Ignacio",
-            instructions=create_project_aware_instructions,
-            tools=all_tools
-        )
+class IgnacioAgentService:
+    """Simple OpenAI Agent SDK-based service for Ignacio Bot"""
 
-        print(f"[AI_SERVICE] Agent setup complete! Main agent '{self.ignacio_agent.name}' ready with {len(all_tools)} total tools")
+    def __init__(self, context_options: ContextOptions | None = None):
+        self.context_options = context_options or ContextOptions()
+        self._setup_agents()
+        self.openai_client = openai_client
+        # sha256 of uploaded document content -> OpenAI file id
+        self._uploaded_file_ids = TTLCache(maxsize=1024, ttl=_UPLOADED_FILE_CACHE_SECONDS)
+        # Upload circuit breaker state (see _UPLOAD_FAILURE_THRESHOLD)
+        self._upload_failures = 0
+        self._uploads_paused_until = 0.0
+        # Normalized first message digest -> generated title
+        self._title_cache = TTLCache(maxsize=1024, ttl=24 * 60 * 60)
+
+    def _setup_agents(self):
+        """Attach the shared agent graph (built once per process) to this service"""
+        agents = _build_agents()
+        self.ignacio_agent = agents.ignacio_agent
+        self.marketing_agent = agents.specialist_agents["marketing"]
+        self.tech_agent = agents.specialist_agents["technology"]
+        self.finance_agent = agents.specialist_agents["finance"]
+        self.sustainability_agent = agents.specialist_agents["sustainability"]
+        self.legal_agent = agents.specialist_agents["legal"]
+        self.operations_agent = agents.specialist_agents["operations"]
+        self.product_agent = agents.specialist_agents["product"]
+        self.sales_agent = agents.specialist_agents["sales"]
 
     async def generate_conversation_title(self, initial_message: str) -> str:
         """Generate a conversation title using OpenAI's gpt-4o-mini model"""
+        # A message that is already title-sized ("Hola", "Ayuda con mi negocio") is its own title
+        words = initial_message.split()
+        if 0 < len(words) <= _SHORT_TITLE_MAX_WORDS and len(initial_message) <= _SHORT_TITLE_MAX_CHARS:
+            return " ".join(words).strip("\"'") or _fallback_title(initial_message)
+
+        # Common openers ("Hola", "Help me with marketing") reuse an earlier title
+        cache_key = hashlib.blake2b(
+            initial_message.strip().lower().encode("utf-8"), digest_size=16
+        ).digest()
+        cached_title = self._title_cache.get(cache_key)
+        if cached_title:
+            return cached_title
+
         try:
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
+            response = await self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[{
                     "role": "system",
-                    "content": "Generate a short, descriptive title (max 6 words) for a conversation based on the user's first message. Focus on the main topic or question."
+                    "content": "Title for this conversation, max 6 words."
                 }, {
                     "role": "user", 
                     "content": initial_message
                 }],
-                max_tokens=20,
+                response_format=_TITLE_RESPONSE_FORMAT,
+                max_tokens=30,
                 temperature=0.3
             )
             
-            title = response.choices[0].message.content.strip()
-            # Remove quotes if present and ensure reasonable length
-            title = title.strip('"\'').strip()
-            return title[:60] if len(title) > 60 else title
+            # Structured output: no quotes or extra prose to strip
+            title = json.loads(response.choices[0].message.content)["title"].strip()
+            if not title:
+                raise ValueError("Empty title")
+            title = title[:60] if len(title) > 60 else title
+            self._title_cache.set(cache_key, title)
+            return title
             
         except Exception as e:
             # Fallback to truncated initial message if title generation fails
-            return initial_message[:50] + "..." if len(initial_message) > 50 else initial_message
+            return _fallback_title(initial_message)
 
-    def _process_file_for_agent(self, file_content: bytes, file_name: str, file_type: str) -> dict:
+    async def _upload_document_to_openai(self, file_content: bytes, file_name: str, file_type: str) -> str:
+        """Upload a document to OpenAI file storage (once per distinct content) and return its file id"""
+        content_hash = hashlib.sha256(file_content).hexdigest()
+        file_id = self._uploaded_file_ids.get(content_hash)
+        if file_id:
+            print(f"[AI_SERVICE] Reusing OpenAI file {file_id} for {file_name}")
+            return file_id
+
+        if time.monotonic() < self._uploads_paused_until:
+            raise RuntimeError("OpenAI file uploads paused after repeated failures")
+
+        try:
+            async with _UPLOAD_SEMAPHORE:
+                uploaded = await self.openai_client.files.create(
+                    file=(file_name, file_content, file_type),
+                    purpose="user_data",
+                    expires_after={
+                        "anchor": "created_at",
+                        "seconds": _UPLOADED_FILE_EXPIRY_SECONDS,
+                    },
+                )
+        except Exception:
+            # Once the breaker opens, a single attempt after each cool-down
+            # probes whether OpenAI has recovered
+            self._upload_failures += 1
+            if self._upload_failures >= _UPLOAD_FAILURE_THRESHOLD:
+                self._uploads_paused_until = time.monotonic() + _UPLOAD_COOLDOWN_SECONDS
+            raise
+
+        self._upload_failures = 0
+        self._uploaded_file_ids.set(content_hash, uploaded.id)
+        return uploaded.id
+
+    async def _prepare_file_input(self, file_content: bytes, file_name: str, file_type: str) -> dict:
+        """Upload documents when needed, then build the Agent SDK input for a file"""
+        file_id = None
+        if file_type in _DOCUMENT_MIME_TYPES:
+            try:
+                file_id = await self._upload_document_to_openai(file_content, file_name, file_type)
+            except Exception as upload_error:
+                print(f"[AI_SERVICE] PDF upload to OpenAI failed, sending inline: {upload_error}")
+
+        if file_id is None and len(file_content) > _INLINE_ENCODE_MAX_BYTES:
+            # Base64-encoding large files is CPU-bound; keep it off the event loop
+            return await asyncio.to_thread(
+                self._process_file_for_agent, file_content, file_name, file_type
+            )
+        return self._process_file_for_agent(file_content, file_name, file_type, file_id=file_id)
+
+    async def _download_and_prepare_file_input(self, file_attachment: UserFile) -> dict:
+        """Fetch a stored attachment and build its Agent SDK input"""
+        file_content = await storage_service.get_file_content(file_attachment.file_path)
+        return await self._prepare_file_input(file_content, file_attachment.file_name, file_attachment.file_type)
+
+    def _process_file_for_agent(self, file_content: bytes, file_name: str, file_type: str, file_id: str | None = None) -> dict:
         """Process a file for Agent SDK input (only supports images and PDFs)"""
         try:
-            if file_type.startswith('image/'):
-                # Handle images with base64 encoding
-                base64_image = base64.b64encode(file_content).decode('utf-8')
-                return {
-                    "type": "input_image",
-                    "image_url": f"data:{file_type};base64,{base64_image}"
-                }
-            
-            elif file_type == 'application/pdf':
-                # Handle PDFs with base64 encoding
-                base64_file = base64.b64encode(file_content).decode('utf-8')
-                return {
-                    "type": "input_file",
-                    "filename": file_name,
-                    "file_data": f"data:{file_type};base64,{base64_file}"
-                }
-            
-            else:
+            build_input = _FILE_INPUT_BUILDERS.get(file_type) or _FILE_INPUT_BUILDERS.get(
+                f"{file_type.partition('/')[0]}/*"
+            )
+            if build_input is None:
                 # This should not happen due to validation in upload endpoints
                 raise ValueError(f"Unsupported file type: {file_type}")
-                
+
+            return build_input(file_content, file_name, file_type, file_id)
+
         except Exception as e:
             # If file processing fails, return a text description
             return {
@@ -265,157 +519,301 @@ class IgnacioAgentService:
                 "text": f"[File attachment: {file_name} - Unable to process: {str(e)}]"
             }
 
+    def _history_window_size(self, total_messages: int) -> int:
+        """Number of most recent messages to replay, only shrinking its start every M messages"""
+        recent = self.context_options.recent_messages
+        buffer = max(self.context_options.recent_message_cache_buffer, 1)
+
+        if total_messages <= recent:
+            return total_messages
+
+        # Advance the window start in steps of `buffer` so the cached prefix
+        # is only invalidated once every `buffer` new messages
+        return recent + (total_messages - recent) % buffer
+
+    def _fit_history_to_budget(self, history_messages: List[dict], budget: int) -> List[dict]:
+        """Drop the oldest replayed turns (never the summary) until the history fits `budget` tokens"""
+        summary = [item for item in history_messages[:1] if item["role"] == "system"]
+        turns = history_messages[len(summary):]
+
+        remaining = budget - sum(_estimate_content_tokens(item["content"]) for item in summary)
+        kept = 0
+        for item in reversed(turns):
+            remaining -= _estimate_content_tokens(item["content"])
+            if remaining < 0:
+                break
+            kept += 1
+
+        # Start on a user turn so no assistant reply is replayed without its question
+        fitted = turns[len(turns) - kept:]
+        while fitted and fitted[0]["role"] != "user":
+            fitted = fitted[1:]
+        return summary + fitted
+
+    def _history_to_agent_messages(self, history: List[Message]) -> List[dict]:
+        """Convert stored messages into Agent SDK input items (oldest first)"""
+        return [
+            {
+                "role": "user" if msg.is_from_user else "assistant",
+                "content": msg.content
+            }
+            for msg in history
+            if msg.content
+        ]
+
     async def start_conversation(self, user_id: UUID, initial_message: str, project_id: UUID | None = None, file_contents: list[tuple[bytes, str, str]] | None = None) -> ConversationResult:
         """Start a new conversation with Ignacio"""
-        start_time = time.time()
-
-        # Generate conversation title using AI
-        generated_title = await self.generate_conversation_title(initial_message)
-
-        # Create conversation in database
+        # Create the conversation under a provisional title while the AI title
+        # is generated, instead of waiting for the title before the insert
         conversation_data = {
             "user_id": user_id,
-            "title": generated_title,
+            "title": _fallback_title(initial_message),
             "language_preference": "es"
         }
         
         if project_id:
             conversation_data["project_id"] = project_id
-            
-        conversation = await db_service.create_conversation(conversation_data)
 
-        # Process the message
-        result = await self.continue_conversation(conversation.id, initial_message, file_contents=file_contents)
+        generated_title, conversation = await asyncio.gather(
+            self.generate_conversation_title(initial_message),
+            db_service.create_conversation(conversation_data),
+        )
+
+        # The title update runs alongside the first agent turn
+        title_update = None
+        if generated_title != conversation.title:
+            title_update = asyncio.create_task(
+                db_service.update_conversation(conversation.id, {"title": generated_title})
+            )
+
+        try:
+            # Process the message
+            result = await self.continue_conversation(conversation.id, initial_message, file_contents=file_contents)
+        finally:
+            if title_update:
+                await title_update
         return result
 
+    async def _run_agent(
+        self,
+        conversation_id: UUID,
+        history_messages: List[dict],
+        message: str,
+        project_context: ProjectContext,
+        file_attachments: List[UserFile] = None,
+        file_contents: List[tuple[bytes, str, str]] = None,
+    ) -> str:
+        """Run the Ignacio agent on the new turn (plus any files) and return its reply"""
+        # Prepare message content for Agent SDK
+        message_content = []
+        file_sizes = []
+
+        # Add file attachments if provided
+        if file_contents:
+            print(f"[AI_SERVICE] Processing {len(file_contents)} file(s) for Agent SDK")
+            # Process files directly from content (more efficient); uploads and
+            # encodes run concurrently and gather keeps the attachment order
+            for file_content, file_name, file_type in file_contents:
+                print(f"[AI_SERVICE] Processing file: {file_name} ({file_type}, {len(file_content)} bytes)")
+            message_content.extend(await asyncio.gather(*(
+                self._prepare_file_input(file_content, file_name, file_type)
+                for file_content, file_name, file_type in file_contents
+            )))
+            file_sizes = [len(file_content) for file_content, _, _ in file_contents]
+        elif file_attachments:
+            # Legacy support: download from storage (less efficient). Each file is
+            # downloaded and encoded independently, so encodes overlap downloads
+            message_content.extend(await asyncio.gather(*(
+                self._download_and_prepare_file_input(file_attachment)
+                for file_attachment in file_attachments
+            )))
+            file_sizes = [file_attachment.file_size for file_attachment in file_attachments]
+
+        # Add text message
+        message_content.append({
+            "type": "input_text",
+            "text": message
+        })
+
+        print(f"[AI_SERVICE] Final message content structure: {len(message_content)} items")
+        for i, item in enumerate(message_content):
+            print(f"[AI_SERVICE] Item {i}: {item.get('type', 'unknown')} - {item.get('filename', 'N/A') if 'filename' in item else 'text content'}")
+
+        # Keep the prompt inside the model's context window. File inputs come
+        # first in the content, in the same order as their sizes.
+        referenced_file_sizes = {
+            item["file_id"]: size
+            for item, size in zip(message_content, file_sizes)
+            if "file_id" in item
+        }
+        turn_tokens = _estimate_content_tokens(message_content, referenced_file_sizes)
+        budget = int(
+            self.context_options.context_window_tokens * self.context_options.context_budget_ratio
+        )
+        if turn_tokens > budget:
+            raise ContextBudgetExceededError(
+                f"Message and attachments (~{turn_tokens} tokens) exceed the model context budget ({budget} tokens)"
+            )
+        fitted_history = self._fit_history_to_budget(history_messages, budget - turn_tokens)
+        if len(fitted_history) < len(history_messages):
+            print(f"[AI_SERVICE] Dropped {len(history_messages) - len(fitted_history)} history message(s) to fit the context window")
+            # Fold what no longer fits into the conversation summary
+            conversation_condenser.schedule(
+                conversation_id,
+                keep_recent=sum(1 for item in fitted_history if item["role"] != "system"),
+            )
+        history_messages = fitted_history
+
+        # Create messages in Agent SDK format. Static instructions come first
+        # (set on the agent), then the replayed history, then the new turn
+        # appended at the end so earlier items form a stable cacheable prefix.
+        agent_messages = history_messages + [
+            {
+                "role": "user",
+                "content": message_content
+            }
+        ]
+
+        print(f"[AI_SERVICE] Calling Agent SDK with {len(agent_messages)} message(s)")
+
+        # Create lifecycle hooks for monitoring handoffs
+        hooks = IgnacioRunHooks()
+        print(f"[AI_SERVICE] Lifecycle hooks enabled for handoff monitoring")
+
+        # Run the main agent with context, file attachments, and lifecycle hooks
+        result = await Runner.run(
+            self.ignacio_agent,
+            agent_messages,
+            context=project_context,
+            hooks=hooks
+        )
+        print(f"[AI_SERVICE] Agent SDK completed successfully")
+        return result.final_output
+
+    async def _persist_turn(
+        self,
+        conversation_id: UUID,
+        previous_message_count: int,
+        user_insert: Awaitable[int],
+        ai_message: MessageCreate,
+    ) -> None:
+        """Store a finished turn, then condense history that scrolled out of the window in the background"""
+        # Both rows are written before the reply is returned, so the client's
+        # follow-up read and the next turn's history include them. The user
+        # row has been in flight since the turn started; only the AI row's
+        # round-trip follows the model run. Neither is read back: ids and
+        # timestamps were assigned up front.
+        await asyncio.gather(user_insert, db_service.insert_messages([ai_message]))
+
+        # Fold history that has scrolled out of the window into the summary
+        recent = self.context_options.recent_messages
+        buffer = max(self.context_options.recent_message_cache_buffer, 1)
+        if previous_message_count + 2 >= recent + buffer:
+            conversation_condenser.schedule(conversation_id, keep_recent=recent)
+
     async def continue_conversation(self, conversation_id: UUID, message: str, file_attachments: List[UserFile] = None, file_contents: List[tuple[bytes, str, str]] = None) -> ConversationResult:
         """Continue an existing conversation with project context"""
-        start_time = time.time()
+        start_time = time.monotonic_ns()
 
-        try:
-            # Get conversation
-            conversation = await db_service.get_conversation(conversation_id)
-            if not conversation:
-                raise ValueError(f"Conversation {conversation_id} not found")
-
-            # Get user information to include name in context
-            user = await db_service.get_user_by_id(conversation.user_id)
-            user_name = user.name if user and user.name else None
-
-            # Load project context based on conversation's project association
-            if conversation.project_id:
-                # Load specific project context
-                project = await db_service.get_project_by_id(conversation.project_id)
-                if project:
-                    # Create project context from the specific project
-                    project_context = ProjectContext(
-                        user_id=str(conversation.user_id),
-                        user_name=user_name,
-                        project_name=project.project_name,
-                        project_type=project.project_type,
-                        description=project.description,
-                        current_stage=project.current_stage,
-                        target_audience=project.target_audience,
-                        problem_statement=project.problem_statement,
-                        solution_approach=project.solution_approach,
-                        business_model=project.business_model,
-                        context_data=project.context_data or {}
-                    )
-                else:
-                    # Fallback to user's general context if project not found
-                    project_context = await project_context_service.get_user_context(conversation.user_id)
-            else:
-                # Load user's general project context (for backwards compatibility)
-                project_context = await project_context_service.get_user_context(conversation.user_id)
-
-            # Prepare message content for Agent SDK
-            message_content = []
-
-            # Add file attachments if provided
-            if file_contents:
-                print(f"[AI_SERVICE] Processing {len(file_contents)} file(s) for Agent SDK")
-                # Process files directly from content (more efficient)
-                for file_content, file_name, file_type in file_contents:
-                    print(f"[AI_SERVICE] Processing file: {file_name} ({file_type}, {len(file_content)} bytes)")
-                    file_input = self._process_file_for_agent(file_content, file_name, file_type)
-                    print(f"[AI_SERVICE] File processed as: {file_input.get('type', 'unknown')}")
-                    message_content.append(file_input)
-            elif file_attachments:
-                # Legacy support: download from storage (less efficient)
-                for file_attachment in file_attachments:
-                    file_content = await storage_service.get_file_content(file_attachment.file_path)
-                    file_input = self._process_file_for_agent(file_content, file_attachment.file_name, file_attachment.file_type)
-                    message_content.append(file_input)
-            
-            # Add text message
-            message_content.append({
-                "type": "input_text",
-                "text": message
-            })
+        # Load conversation, user name, project and recent history in one round-trip
+        max_window = (
+            self.context_options.recent_messages
+            + max(self.context_options.recent_message_cache_buffer, 1) - 1
+        )
+        bundle = await db_service.load_turn_bundle(conversation_id, message_limit=max_window)
+        if not bundle:
+            raise ValueError(f"Conversation {conversation_id} not found")
+        conversation = bundle.conversation
+
+        # User message to store (attachments temporarily disabled until database migration)
+        user_message = MessageCreate(
+            conversation_id=conversation_id,
+            user_id=conversation.user_id,
+            content=message,
+            message_type=MessageType.TEXT,
+            is_from_user=True,
+            created_at=datetime.now(timezone.utc)
+        )
 
-            print(f"[AI_SERVICE] Final message content structure: {len(message_content)} items")
-            for i, item in enumerate(message_content):
-                print(f"[AI_SERVICE] Item {i}: {item.get('type', 'unknown')} - {item.get('filename', 'N/A') if 'filename' in item else 'text content'}")
-
-            # Create messages in Agent SDK format
-            agent_messages = [
-                {
-                    "role": "user",
-                    "content": message_content
-                }
-            ]
-
-            print(f"[AI_SERVICE] Calling Agent SDK with {len(agent_messages)} message(s)")
-
-            # Create lifecycle hooks for monitoring handoffs
-            hooks = IgnacioRunHooks()
-            print(f"[AI_SERVICE] Lifecycle hooks enabled for handoff monitoring")
-
-            # Run the main agent with context, file attachments, and lifecycle hooks
-            result = await Runner.run(
-                self.ignacio_agent,
-                agent_messages,
-                context=project_context,
-                hooks=hooks
-            )
-            print(f"[AI_SERVICE] Agent SDK completed successfully")
+        # Project context comes from the conversation's project, falling back
+        # to the user's latest project (resolved server-side in the bundle)
+        project_context = ProjectContext.from_project(
+            conversation.user_id, bundle.user_name, bundle.project
+        )
 
-            execution_time = int((time.time() - start_time) * 1000)
+        # Prior turns are replayed ahead of the new message
+        window_size = self._history_window_size(bundle.message_count)
+        history_messages = self._history_to_agent_messages(
+            bundle.recent_messages[-window_size:] if window_size else []
+        )
+        if bundle.summary:
+            history_messages.insert(0, {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{bundle.summary}"
+            })
 
-            # Create and store user message (attachments temporarily disabled until database migration)
-            user_message = MessageCreate(
-                conversation_id=conversation_id,
-                user_id=conversation.user_id,
-                content=message,
-                message_type=MessageType.TEXT,
-                is_from_user=True
-            )
-            await db_service.create_message(user_message)
-
-            # Create and store AI response message
-            ai_message = MessageCreate(
-                conversation_id=conversation_id,
-                user_id=conversation.user_id,
-                content=result.final_output,
-                message_type=MessageType.TEXT,
-                is_from_user=False
-            )
-            await db_service.create_message(ai_message)
-
-            return ConversationResult(
-                conversation_id=conversation_id,
-                response_text=result.final_output,
-                agent_used="ignacio",
-                tools_called=[],
-                confidence_score=0.9,
-                suggested_actions=[],
-                requires_followup=False,
-                execution_time_ms=execution_time
-            )
+        # The user's message is stored while the reply is generated, so the
+        # write overlaps the agent run instead of following it
+        user_insert = asyncio.create_task(db_service.insert_messages([user_message]))
+        try:
+            # Near-identical questions from the same user about the same project
+            # reuse the cached answer, across conversations. Editing the project
+            # bumps updated_at and so starts a fresh scope. Turns with files always
+            # go to the agent.
+            cache_lookup = None
+            if response_cache and not (file_contents or file_attachments):
+                try:
+                    cache_scope = (
+                        conversation.user_id,
+                        bundle.project.id if bundle.project else None,
+                        bundle.project.updated_at if bundle.project else None,
+                    )
+                    cache_lookup = await response_cache.lookup(cache_scope, message)
+                except Exception as e:
+                    print(f"[AI_SERVICE] Semantic cache lookup failed: {e}")
 
-        except Exception as e:
-            execution_time = int((time.time() - start_time) * 1000)
-            raise e
+            if cache_lookup and cache_lookup.response is not None:
+                print(f"[AI_SERVICE] Semantic cache hit for conversation {conversation_id}")
+                response_text = cache_lookup.response
+            else:
+                response_text = await self._run_agent(
+                    conversation_id, history_messages, message, project_context, file_attachments, file_contents
+                )
+                if cache_lookup:
+                    response_cache.store(cache_lookup, response_text)
+        except Exception:
+            # A failed turn still keeps the user's message
+            await user_insert
+            raise
+
+        execution_time = (time.monotonic_ns() - start_time) // 1_000_000
+
+        # AI response message; its id and timestamp are assigned here so the
+        # returned message matches the stored row without reading it back
+        ai_message = MessageCreate(
+            id=uuid4(),
+            conversation_id=conversation_id,
+            user_id=conversation.user_id,
+            content=response_text,
+            message_type=MessageType.TEXT,
+            is_from_user=False,
+            created_at=datetime.now(timezone.utc)
+        )
+        await self._persist_turn(
+            conversation_id, bundle.message_count, user_insert, ai_message
+        )
+
+        return ConversationResult(
+            conversation_id=conversation_id,
+            response_text=response_text,
+            agent_used="ignacio",
+            tools_called=[],
+            confidence_score=0.9,
+            suggested_actions=[],
+            requires_followup=False,
+            execution_time_ms=execution_time,
+            message=Message(**ai_message.model_dump())
+        )
 
 
 # Global service instance
@@ -427,3 +825,9 @@ def get_ignacio_service() -> IgnacioAgentService:
     if ignacio_service is None:
         ignacio_service = IgnacioAgentService()
     return ignacio_service
+
+
+async def warmup() -> None:
+    """Construct the shared service (agent graph, caches) at application startup"""
+    get_ignacio_service()
+    print("[AI_SERVICE] Ignacio service warmed up")
@@ -0,0 +1,114 @@
+"""
+Conversation Condenser for Ignacio Bot
+Folds conversation history that has scrolled out of the rolling window into a
+single summary message, so replayed context stays bounded as chats grow
+"""
+
+from uuid import UUID
+
+from app.core.background import run_in_background
+from app.core.openai_client import openai_client
+from app.models.database import Message
+from app.services.database import db_service
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain the running memory of a mentoring conversation between a "
+    "user and Ignacio, an assistant for the Action Lab program. Summarize the "
+    "transcript below into a concise brief that preserves facts about the user "
+    "and their project, decisions taken, advice given, and open questions. If "
+    "the transcript starts with an earlier summary, merge it into the new one. "
+    "Write in the language of the conversation."
+)
+
+
+class ConversationCondenser:
+    """Summarizes everything but the most recent messages of a conversation"""
+
+    def __init__(self, model: str = "gpt-4o-mini"):
+        self.model = model
+        self.openai_client = openai_client
+        self._in_progress: set[UUID] = set()
+
+    def schedule(self, conversation_id: UUID, keep_recent: int) -> None:
+        """Condense a conversation in the background (at most one run per conversation)"""
+        if conversation_id in self._in_progress:
+            return
+
+        self._in_progress.add(conversation_id)
+        run_in_background(
+            self._run(conversation_id, keep_recent),
+            f"Condensing conversation {conversation_id}",
+        )
+
+    async def _run(self, conversation_id: UUID, keep_recent: int) -> None:
+        try:
+            await self.condense(conversation_id, keep_recent)
+        except Exception as e:
+            print(f"[CONDENSER] Failed to condense conversation {conversation_id}: {e}")
+        finally:
+            self._in_progress.discard(conversation_id)
+
+    async def condense(self, conversation_id: UUID, keep_recent: int) -> Message | None:
+        """Replace all but the last `keep_recent` messages with one summary message"""
+        messages = await db_service.get_uncondensed_messages(conversation_id)
+        regular = [m for m in messages if not m.is_summary]
+        if len(regular) <= keep_recent:
+            return None
+
+        # The previous summary (if any) precedes every uncondensed message, so
+        # folding it in with the overflow keeps a single running summary
+        boundary = regular[-keep_recent] if keep_recent > 0 else None
+        to_condense = [
+            m for m in messages
+            if boundary is None or m.created_at < boundary.created_at
+        ]
+        if not to_condense:
+            return None
+
+        summary_text = await self._summarize(to_condense)
+        if not summary_text:
+            # Refusals and empty completions leave the messages uncondensed,
+            # to be retried on a later turn
+            print(f"[CONDENSER] Empty summary for conversation {conversation_id}, skipping")
+            return None
+
+        # Timestamp the summary at the end of the span it replaces so it sorts
+        # ahead of the messages that are still replayed verbatim
+        summary = await db_service.create_summary_message(
+            conversation_id,
+            to_condense[-1].user_id,
+            summary_text,
+            to_condense[-1].created_at,
+        )
+        condensed_count = await db_service.mark_messages_condensed(
+            [m.id for m in to_condense]
+        )
+        print(f"[CONDENSER] Condensed {condensed_count} messages in conversation {conversation_id}")
+        return summary
+
+    async def _summarize(self, messages: list[Message]) -> str:
+        transcript = "\n".join(
+            f"{self._speaker(message)}: {message.content}"
+            for message in messages
+            if message.content
+        )
+
+        response = await self.openai_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": transcript},
+            ],
+            temperature=0.2,
+        )
+        return (response.choices[0].message.content or "").strip()
+
+    @staticmethod
+    def _speaker(message: Message) -> str:
+        if message.is_summary:
+            return "Earlier summary"
+        return "User" if message.is_from_user else "Ignacio"
+
+
+# Global condenser instance
+conversation_condenser = ConversationCondenser()
@@ -3,18 +3,25 @@ Database service layer for Ignacio Bot
 Provides CRUD operations for all database models using Supabase API
 """
 
+import asyncio
 from datetime import datetime
 from uuid import UUID
 
+from postgrest.types import CountMethod, ReturnMethod
+from pydantic import TypeAdapter
+
+from app.core.cache import TTLCache
 from app.core.database import supabase
 from app.models.database import (
     AgentInteraction,
     AgentInteractionCreate,
     Conversation,
     ConversationCreate,
+    ConversationTurnBundle,
     ConversationUpdate,
     Message,
     MessageCreate,
+    MessageType,
     MessageWithAttachments,
     OTPCode,
     OTPCodeCreate,
@@ -32,16 +39,88 @@ from app.models.database import (
 )
 
 
+# Columns for conversation lists; the JSONB agent_state/project_context blobs are
+# only loaded for single conversations (the model defaults them to {})
+_CONVERSATION_LIST_COLUMNS = "id,user_id,title,project_id,language_preference,created_at,updated_at"
+
+
+def _past_cursor(op: str, created_at: datetime, row_id: UUID) -> str:
+    """PostgREST or-filter for rows past a (created_at, id) keyset cursor ("lt" or "gt")"""
+    # Callers also bound created_at with lte/gte so the created_at index still
+    # drives an ordered range scan. Timestamps hold reserved characters
+    # (":" and "."), so they are quoted
+    timestamp = created_at.isoformat()
+    return f'created_at.{op}."{timestamp}",and(created_at.eq."{timestamp}",id.{op}.{row_id})'
+
+
+# Whole-result validators: one call per list instead of a model per row
+_USER_LIST = TypeAdapter(list[User])
+_CONVERSATION_LIST = TypeAdapter(list[Conversation])
+_MESSAGE_LIST = TypeAdapter(list[Message])
+_USER_FILE_LIST = TypeAdapter(list[UserFile])
+_AGENT_INTERACTION_LIST = TypeAdapter(list[AgentInteraction])
+_PROJECT_LIST = TypeAdapter(list[Project])
+_PROMPT_TEMPLATE_LIST = TypeAdapter(list[PromptTemplate])
+
+
 class DatabaseService:
     """Service class for database operations using Supabase API"""
 
     def __init__(self):
         self.client = supabase
+        # Project data is read on most chat turns but rarely changes;
+        # entries are invalidated by the project write methods below
+        self._project_cache = TTLCache(maxsize=10_000, ttl=300)
+        self._user_projects_cache = TTLCache(maxsize=10_000, ttl=300)
+        # Users are looked up on every authenticated request; entries are keyed
+        # by id and invalidated by the user write methods below. The index maps
+        # (field, value) to a user id and is re-checked against the cached user.
+        self._user_cache = TTLCache(maxsize=10_000, ttl=60)
+        self._user_id_index = TTLCache(maxsize=20_000, ttl=60)
+        # The template library is small and read-mostly: keep the whole table
+        # briefly and filter in memory; the template write methods clear it
+        self._templates_cache = TTLCache(maxsize=1, ttl=30)
+        # Single conversations and files are re-read by most chat and file
+        # requests; the write methods below pop entries, and the rare cascading
+        # deletes (user, project) clear these caches outright
+        self._conversation_cache = TTLCache(maxsize=10_000, ttl=30)
+        self._file_cache = TTLCache(maxsize=10_000, ttl=30)
+
+    async def _exec(self, query):
+        """Execute a (synchronous) Supabase query in a worker thread, off the event loop"""
+        return await asyncio.to_thread(query.execute)
+
+    async def _exists(self, table: str, column: str, value: str) -> bool:
+        """Check whether a matching row exists (HEAD request, no row body)"""
+        response = await self._exec(
+            self.client.table(table)
+            .select("id", count=CountMethod.exact, head=True)
+            .eq(column, value)
+        )
+        return (response.count or 0) > 0
 
     # User operations
+    def _cache_user(self, user: User) -> User:
+        """Cache a user loaded from the database and return a copy for the caller"""
+        user_id = str(user.id)
+        self._user_cache.set(user_id, user)
+        if user.auth_user_id:
+            self._user_id_index.set(("auth_user_id", user.auth_user_id), user_id)
+        if user.phone_number:
+            self._user_id_index.set(("phone_number", user.phone_number), user_id)
+        return user.model_copy()
+
+    def _get_cached_user_by(self, field: str, value: str) -> User | None:
+        """Return a cached user whose `field` currently equals `value`"""
+        user_id = self._user_id_index.get((field, value))
+        user = self._user_cache.get(user_id) if user_id else None
+        if user is not None and getattr(user, field) == value:
+            return user.model_copy()
+        return None
+
     async def create_user(self, user_data: UserCreate) -> User:
         """Create a new user"""
-        response = (
+        response = await self._exec(
             self.client.table("users")
             .insert(
                 {
@@ -52,7 +131,6 @@ class DatabaseService:
                     "auth_user_id": user_data.auth_user_id,
                 }
             )
-            .execute()
         )
 
         if response.data:
@@ -61,51 +139,75 @@ class DatabaseService:
 
     async def get_user_by_id(self, user_id: UUID) -> User | None:
         """Get user by ID"""
-        response = (
-            self.client.table("users").select("*").eq("id", str(user_id)).execute()
+        cached = self._user_cache.get(str(user_id))
+        if cached is not None:
+            return cached.model_copy()
+
+        response = await self._exec(
+            self.client.table("users").select("*").eq("id", str(user_id))
         )
 
         if response.data:
-            return User(**response.data[0])
+            return self._cache_user(User(**response.data[0]))
         return None
 
     async def get_user_by_auth_id(self, auth_id: UUID) -> User | None:
         """Get user by ID"""
-        response = (
+        cached = self._get_cached_user_by("auth_user_id", str(auth_id))
+        if cached is not None:
+            return cached
+
+        response = await self._exec(
             self.client.table("users")
             .select("*")
             .eq("auth_user_id", str(auth_id))
-            .execute()
         )
 
         if response.data:
-            return User(**response.data[0])
+            return self._cache_user(User(**response.data[0]))
         return None
 
     async def get_user_by_phone(self, phone_number: str) -> User | None:
         """Get user by phone number"""
-        response = (
+        cached = self._get_cached_user_by("phone_number", phone_number)
+        if cached is not None:
+            return cached
+
+        response = await self._exec(
             self.client.table("users")
             .select("*")
             .eq("phone_number", phone_number)
-            .execute()
         )
 
         if response.data:
-            return User(**response.data[0])
+            return self._cache_user(User(**response.data[0]))
         return None
 
-    async def get_users(self, limit: int = 100, offset: int = 0) -> list[User]:
-        """Get all users with pagination"""
-        response = (
-            self.client.table("users")
-            .select("*")
-            .order("created_at", desc=True)
+    async def get_users(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        before: datetime | None = None,
+        before_id: UUID | None = None,
+    ) -> list[User]:
+        """Get all users with pagination (newest first; pass the last user's `created_at`/`id` as `before`/`before_id` for the next page)"""
+        query = self.client.table("users").select("*")
+        if before is not None:
+            # Keyset pagination: seek past the cursor instead of scanning `offset`
+            # rows; the id breaks ties between users created in the same instant
+            if before_id is not None:
+                query = query.lte("created_at", before.isoformat()).or_(
+                    _past_cursor("lt", before, before_id)
+                )
+            else:
+                query = query.lt("created_at", before.isoformat())
+        response = await self._exec(
+            query.order("created_at", desc=True)
+            .order("id", desc=True)
             .range(offset, offset + limit - 1)
-            .execute()
         )
 
-        return [User(**row) for row in response.data]
+        return _USER_LIST.validate_python(response.data)
 
     async def update_user(self, user_id: UUID, user_data: UserUpdate) -> User | None:
         """Update user"""
@@ -124,12 +226,12 @@ class DatabaseService:
         if not update_dict:
             return await self.get_user_by_id(user_id)
 
-        response = (
+        response = await self._exec(
             self.client.table("users")
             .update(update_dict)
             .eq("id", str(user_id))
-            .execute()
         )
+        self._user_cache.pop(str(user_id))
 
         if response.data:
             return User(**response.data[0])
@@ -137,8 +239,16 @@ class DatabaseService:
 
     async def delete_user(self, user_id: UUID) -> bool:
         """Delete user"""
-        response = self.client.table("users").delete().eq("id", str(user_id)).execute()
-        return len(response.data) > 0
+        response = await self._exec(
+            self.client.table("users")
+            .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+            .eq("id", str(user_id))
+        )
+        self._user_cache.pop(str(user_id))
+        # Conversations and files cascade with the user
+        self._conversation_cache.clear()
+        self._file_cache.clear()
+        return (response.count or 0) > 0
 
     # Conversation operations
     async def create_conversation(
@@ -170,7 +280,9 @@ class DatabaseService:
                 "project_context": getattr(conv_data, "project_context", {}),
             }
 
-        response = self.client.table("conversations").insert(insert_data).execute()
+        response = await self._exec(
+            self.client.table("conversations").insert(insert_data)
+        )
 
         if response.data:
             return Conversation(**response.data[0])
@@ -178,33 +290,64 @@ class DatabaseService:
 
     async def get_user_conversations(self, user_id: UUID) -> list[Conversation]:
         """Get all conversations for a user"""
-        response = (
+        response = await self._exec(
             self.client.table("conversations")
-            .select("*")
+            .select(_CONVERSATION_LIST_COLUMNS)
             .eq("user_id", str(user_id))
             .order("updated_at", desc=True)
-            .execute()
         )
 
-        return [Conversation(**row) for row in response.data]
+        return _CONVERSATION_LIST.validate_python(response.data)
+
+    async def get_user_conversations_with_message_counts(
+        self, user_id: UUID
+    ) -> list[tuple[Conversation, int]]:
+        """Get all conversations for a user with their message counts in one query"""
+        response = await self._exec(
+            self.client.table("conversations")
+            .select(f"{_CONVERSATION_LIST_COLUMNS}, messages(count)")
+            .eq("user_id", str(user_id))
+            .eq("messages.is_summary", False)
+            .order("updated_at", desc=True)
+        )
+
+        result = []
+        for row in response.data:
+            counts = row.pop("messages", None) or [{"count": 0}]
+            result.append((Conversation(**row), counts[0]["count"]))
+        return result
 
     async def get_conversation_by_id(self, conv_id: UUID) -> Conversation | None:
         """Get conversation by ID"""
-        response = (
+        cached = self._conversation_cache.get(str(conv_id))
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
+        response = await self._exec(
             self.client.table("conversations")
             .select("*")
             .eq("id", str(conv_id))
-            .execute()
         )
 
         if response.data:
-            return Conversation(**response.data[0])
+            conversation = Conversation(**response.data[0])
+            self._conversation_cache.set(str(conv_id), conversation)
+            return conversation.model_copy(deep=True)
         return None
 
+    async def conversation_exists(self, conv_id: UUID) -> bool:
+        """Check that a conversation exists without loading it"""
+        if self._conversation_cache.get(str(conv_id)) is not None:
+            return True
+        return await self._exists("conversations", "id", str(conv_id))
+
     async def update_conversation(
-        self, conv_id: UUID, conv_data: ConversationUpdate | dict
+        self,
+        conv_id: UUID,
+        conv_data: ConversationUpdate | dict,
+        current: Conversation | None = None,
     ) -> Conversation | None:
-        """Update conversation with Agent SDK support"""
+        """Update conversation with Agent SDK support (`current`, if loaded, is returned for empty updates)"""
         if isinstance(conv_data, dict):
             # Handle dict input from Agent SDK
             update_dict = conv_data
@@ -217,22 +360,22 @@ class DatabaseService:
                 update_dict["project_id"] = str(conv_data.project_id)
 
         if not update_dict:
-            return await self.get_conversation_by_id(conv_id)
+            # No fields changed: skip the write, and the read if the caller has the row
+            return current or await self.get_conversation_by_id(conv_id)
 
-        response = (
+        response = await self._exec(
             self.client.table("conversations")
             .update(update_dict)
             .eq("id", str(conv_id))
-            .execute()
         )
+        self._conversation_cache.pop(str(conv_id))
 
         if response.data:
             return Conversation(**response.data[0])
         return None
 
     # Message operations
-    async def create_message(self, msg_data: MessageCreate) -> Message:
-        """Create a new message"""
+    def _message_insert_data(self, msg_data: MessageCreate) -> dict:
         insert_data = {
             "conversation_id": str(msg_data.conversation_id),
             "user_id": str(msg_data.user_id),
@@ -243,43 +386,142 @@ class DatabaseService:
             "whatsapp_message_id": msg_data.whatsapp_message_id,
         }
 
+        # Caller-assigned identity (otherwise generated by the database)
+        if msg_data.id is not None:
+            insert_data["id"] = str(msg_data.id)
+        if msg_data.created_at is not None:
+            insert_data["created_at"] = msg_data.created_at.isoformat()
+
         # Add attachments if provided
         if hasattr(msg_data, "attachments") and msg_data.attachments:
             insert_data["attachments"] = [
                 str(file_id) for file_id in msg_data.attachments
             ]
 
-        response = self.client.table("messages").insert(insert_data).execute()
+        return insert_data
+
+    async def create_message(self, msg_data: MessageCreate) -> Message:
+        """Create a new message"""
+        insert_data = self._message_insert_data(msg_data)
+
+        response = await self._exec(
+            self.client.table("messages").insert(insert_data)
+        )
 
         if response.data:
             return Message(**response.data[0])
         raise Exception("Failed to create message")
 
+    async def insert_messages(self, messages: list[MessageCreate]) -> int:
+        """Store messages without reading the rows back; returns the number inserted"""
+        if not messages:
+            return 0
+
+        # For writers that don't need the stored rows (e.g. ids assigned up
+        # front), so the message contents aren't echoed back in the response
+        response = await self._exec(
+            self.client.table("messages")
+            .insert(
+                [self._message_insert_data(msg_data) for msg_data in messages],
+                count=CountMethod.exact,
+                returning=ReturnMethod.minimal,
+                default_to_null=False,
+            )
+        )
+        return response.count or 0
+
     async def get_conversation_messages(
-        self, conv_id: UUID, limit: int = 50, offset: int = 0
+        self,
+        conv_id: UUID,
+        limit: int = 50,
+        offset: int = 0,
+        after: datetime | None = None,
+        after_id: UUID | None = None,
     ) -> list[Message]:
-        """Get messages for a conversation"""
-        response = (
+        """Get messages for a conversation (oldest first; pass the last message's `created_at`/`id` as `after`/`after_id` for the next page)"""
+        query = (
             self.client.table("messages")
             .select("*")
             .eq("conversation_id", str(conv_id))
-            .order("created_at", desc=False)
+            .eq("is_summary", False)
+        )
+        if after is not None:
+            # Keyset pagination: seek past the cursor instead of scanning `offset`
+            # rows; the id breaks ties between messages with the same timestamp
+            if after_id is not None:
+                query = query.gte("created_at", after.isoformat()).or_(
+                    _past_cursor("gt", after, after_id)
+                )
+            else:
+                query = query.gt("created_at", after.isoformat())
+        response = await self._exec(
+            query.order("created_at", desc=False)
+            .order("id", desc=False)
             .range(offset, offset + limit - 1)
-            .execute()
         )
 
-        return [Message(**row) for row in response.data]
+        return _MESSAGE_LIST.validate_python(response.data)
+
+    async def get_uncondensed_messages(self, conv_id: UUID) -> list[Message]:
+        """Get every message (including the current summary) not yet folded into a summary"""
+        response = await self._exec(
+            self.client.table("messages")
+            .select("*")
+            .eq("conversation_id", str(conv_id))
+            .eq("condensed", False)
+            .order("created_at", desc=False)
+        )
+
+        return _MESSAGE_LIST.validate_python(response.data)
+
+    async def create_summary_message(
+        self, conv_id: UUID, user_id: UUID, content: str, created_at: datetime
+    ) -> Message:
+        """Store a condenser summary positioned at the end of the span it replaces"""
+        response = await self._exec(
+            self.client.table("messages")
+            .insert(
+                {
+                    "conversation_id": str(conv_id),
+                    "user_id": str(user_id),
+                    "content": content,
+                    "message_type": MessageType.TEXT.value,
+                    "is_from_user": False,
+                    "is_summary": True,
+                    "created_at": created_at.isoformat(),
+                }
+            )
+        )
+
+        if response.data:
+            return Message(**response.data[0])
+        raise Exception("Failed to create summary message")
+
+    async def mark_messages_condensed(self, message_ids: list[UUID]) -> int:
+        """Flag messages as folded into a summary; returns the number updated"""
+        if not message_ids:
+            return 0
+
+        response = await self._exec(
+            self.client.table("messages")
+            .update(
+                {"condensed": True},
+                count=CountMethod.exact,
+                returning=ReturnMethod.minimal,
+            )
+            .in_("id", [str(message_id) for message_id in message_ids])
+        )
+        return response.count or 0
 
     async def get_message_with_attachments(
         self, message_id: UUID
     ) -> MessageWithAttachments | None:
         """Get a message with its attached files"""
         # Get the message
-        message_response = (
+        message_response = await self._exec(
             self.client.table("messages")
             .select("*")
             .eq("id", str(message_id))
-            .execute()
         )
 
         if not message_response.data:
@@ -287,13 +529,19 @@ class DatabaseService:
 
         message_data = message_response.data[0]
 
-        # Get attached files if any
+        # Get attached files if any, in one query, keeping the attachment order
         attachment_files = []
-        if message_data.get("attachments"):
-            for file_id in message_data["attachments"]:
-                file_record = await self.get_file_by_id(UUID(file_id))
-                if file_record:
-                    attachment_files.append(file_record)
+        attachment_ids = [str(file_id) for file_id in message_data.get("attachments") or []]
+        if attachment_ids:
+            files_response = await self._exec(
+                self.client.table("user_files")
+                .select("*")
+                .in_("id", attachment_ids)
+            )
+            files_by_id = {row["id"]: UserFile(**row) for row in files_response.data}
+            attachment_files = [
+                files_by_id[file_id] for file_id in attachment_ids if file_id in files_by_id
+            ]
 
         message = Message(**message_data)
         return MessageWithAttachments(
@@ -303,7 +551,7 @@ class DatabaseService:
     # OTP operations
     async def create_otp(self, otp_data: OTPCodeCreate) -> OTPCode:
         """Create a new OTP code"""
-        response = (
+        response = await self._exec(
             self.client.table("otp_codes")
             .insert(
                 {
@@ -313,7 +561,6 @@ class DatabaseService:
                     "is_used": otp_data.is_used,
                 }
             )
-            .execute()
         )
 
         if response.data:
@@ -321,36 +568,22 @@ class DatabaseService:
         raise Exception("Failed to create OTP")
 
     async def verify_otp(self, phone_number: str, code: str) -> OTPCode | None:
-        """Verify OTP code"""
-        # Get valid, unused OTP
-        response = (
-            self.client.table("otp_codes")
-            .select("*")
-            .eq("phone_number", phone_number)
-            .eq("code", code)
-            .eq("is_used", False)
-            .gt("expires_at", datetime.now().isoformat())
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
+        """Verify OTP code and mark it used (atomically, in one RPC)"""
+        response = await self._exec(
+            self.client.rpc(
+                "consume_otp",
+                {"p_phone_number": phone_number, "p_code": code},
+            )
         )
 
-        if not response.data:
-            return None
-
-        otp_record = response.data[0]
-
-        # Mark OTP as used
-        self.client.table("otp_codes").update({"is_used": True}).eq(
-            "id", otp_record["id"]
-        ).execute()
-
-        return OTPCode(**otp_record)
+        if response.data:
+            return OTPCode(**response.data[0])
+        return None
 
     # Session operations
     async def create_session(self, session_data: UserSessionCreate) -> UserSession:
         """Create a new user session"""
-        response = (
+        response = await self._exec(
             self.client.table("user_sessions")
             .insert(
                 {
@@ -359,7 +592,6 @@ class DatabaseService:
                     "expires_at": session_data.expires_at.isoformat(),
                 }
             )
-            .execute()
         )
 
         if response.data:
@@ -368,12 +600,13 @@ class DatabaseService:
 
     async def get_session_by_token(self, token: str) -> UserSession | None:
         """Get session by token"""
-        response = (
+        response = await self._exec(
             self.client.table("user_sessions")
             .select("*")
             .eq("session_token", token)
-            .gt("expires_at", datetime.now().isoformat())
-            .execute()
+            # Postgres reads the timestamp literal 'now' as the transaction time,
+            # so expiry is checked against the database clock
+            .gt("expires_at", "now")
         )
 
         if response.data:
@@ -382,13 +615,12 @@ class DatabaseService:
 
     async def delete_session(self, token: str) -> bool:
         """Delete session"""
-        response = (
+        response = await self._exec(
             self.client.table("user_sessions")
-            .delete()
+            .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
             .eq("session_token", token)
-            .execute()
         )
-        return len(response.data) > 0
+        return (response.count or 0) > 0
 
     # File operations
     async def create_user_file(self, file_data: UserFileCreate) -> UserFile:
@@ -405,7 +637,9 @@ class DatabaseService:
         if file_data.conversation_id:
             insert_data["conversation_id"] = str(file_data.conversation_id)
 
-        response = self.client.table("user_files").insert(insert_data).execute()
+        response = await self._exec(
+            self.client.table("user_files").insert(insert_data)
+        )
 
         if response.data:
             return UserFile(**response.data[0])
@@ -413,36 +647,40 @@ class DatabaseService:
 
     async def get_user_files(self, user_id: UUID) -> list[UserFile]:
         """Get all files for a user"""
-        response = (
+        response = await self._exec(
             self.client.table("user_files")
             .select("*")
             .eq("user_id", str(user_id))
             .order("created_at", desc=True)
-            .execute()
         )
 
-        return [UserFile(**row) for row in response.data]
+        return _USER_FILE_LIST.validate_python(response.data)
 
     async def get_conversation_files(self, conversation_id: UUID) -> list[UserFile]:
         """Get all files for a conversation"""
-        response = (
+        response = await self._exec(
             self.client.table("user_files")
             .select("*")
             .eq("conversation_id", str(conversation_id))
             .order("created_at", desc=True)
-            .execute()
         )
 
-        return [UserFile(**row) for row in response.data]
+        return _USER_FILE_LIST.validate_python(response.data)
 
     async def get_file_by_id(self, file_id: UUID) -> UserFile | None:
         """Get file by ID"""
-        response = (
-            self.client.table("user_files").select("*").eq("id", str(file_id)).execute()
+        cached = self._file_cache.get(str(file_id))
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
+        response = await self._exec(
+            self.client.table("user_files").select("*").eq("id", str(file_id))
         )
 
         if response.data:
-            return UserFile(**response.data[0])
+            file = UserFile(**response.data[0])
+            self._file_cache.set(str(file_id), file)
+            return file.model_copy(deep=True)
         return None
 
     async def update_file_openai_info(
@@ -468,21 +706,24 @@ class DatabaseService:
         if not update_data:
             return False
 
-        response = (
+        response = await self._exec(
             self.client.table("user_files")
-            .update(update_data)
+            .update(update_data, count=CountMethod.exact, returning=ReturnMethod.minimal)
             .eq("id", str(file_id))
-            .execute()
         )
+        self._file_cache.pop(str(file_id))
 
-        return len(response.data) > 0
+        return (response.count or 0) > 0
 
     async def delete_user_file(self, file_id: UUID) -> bool:
         """Delete a user file record"""
-        response = (
-            self.client.table("user_files").delete().eq("id", str(file_id)).execute()
+        response = await self._exec(
+            self.client.table("user_files")
+            .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+            .eq("id", str(file_id))
         )
-        return len(response.data) > 0
+        self._file_cache.pop(str(file_id))
+        return (response.count or 0) > 0
 
     # Enhanced methods for Agent SDK
 
@@ -490,22 +731,40 @@ class DatabaseService:
         """Get conversation by ID (alias for get_conversation_by_id for Agent SDK compatibility)"""
         return await self.get_conversation_by_id(conversation_id)
 
+    async def load_turn_bundle(
+        self, conversation_id: UUID, message_limit: int = 10
+    ) -> ConversationTurnBundle | None:
+        """Load conversation, user name, context project and recent messages in one RPC"""
+        response = await self._exec(
+            self.client.rpc(
+                "load_turn_bundle",
+                {
+                    "p_conversation_id": str(conversation_id),
+                    "p_message_limit": message_limit,
+                },
+            )
+        )
+
+        if response.data:
+            return ConversationTurnBundle(**response.data)
+        return None
+
     async def update_user_file(self, file_id: UUID, update_data: dict) -> bool:
         """Update user file with arbitrary data"""
-        response = (
+        response = await self._exec(
             self.client.table("user_files")
-            .update(update_data)
+            .update(update_data, count=CountMethod.exact, returning=ReturnMethod.minimal)
             .eq("id", str(file_id))
-            .execute()
         )
-        return len(response.data) > 0
+        self._file_cache.pop(str(file_id))
+        return (response.count or 0) > 0
 
     # Agent Interaction operations
     async def create_agent_interaction(
         self, interaction_data: AgentInteractionCreate
     ) -> AgentInteraction:
         """Create a new agent interaction"""
-        response = (
+        response = await self._exec(
             self.client.table("agent_interactions")
             .insert(
                 {
@@ -517,7 +776,6 @@ class DatabaseService:
                     "execution_time_ms": interaction_data.execution_time_ms,
                 }
             )
-            .execute()
         )
 
         if response.data:
@@ -529,29 +787,41 @@ class DatabaseService:
         self, conversation_id: UUID
     ) -> list[AgentInteraction]:
         """Get all agent interactions for a conversation"""
-        response = (
+        response = await self._exec(
             self.client.table("agent_interactions")
             .select("*")
             .eq("conversation_id", str(conversation_id))
             .order("created_at", desc=False)
-            .execute()
         )
 
-        return [AgentInteraction(**item) for item in response.data]
+        return _AGENT_INTERACTION_LIST.validate_python(response.data)
 
     # User Project operations
+    def _invalidate_project_caches(
+        self, project_id: UUID | str | None = None, user_id: UUID | str | None = None
+    ) -> None:
+        """Drop cached project lookups after a project write"""
+        if project_id is not None:
+            self._project_cache.pop(str(project_id))
+        if user_id is not None:
+            self._user_projects_cache.pop(str(user_id))
+
     async def get_user_projects(self, user_id: UUID) -> list[Project]:
         """Get all projects for a user"""
-        print(str(user_id))
-        response = (
+        cached = self._user_projects_cache.get(str(user_id))
+        if cached is not None:
+            return [project.model_copy(deep=True) for project in cached]
+
+        response = await self._exec(
             self.client.table("user_projects")
             .select("*")
             .eq("user_id", str(user_id))
             .order("created_at", desc=True)
-            .execute()
         )
 
-        return [Project(**item) for item in response.data]
+        projects = _PROJECT_LIST.validate_python(response.data)
+        self._user_projects_cache.set(str(user_id), projects)
+        return [project.model_copy(deep=True) for project in projects]
 
     async def create_user_project(self, project_data: dict) -> Project:
         """Create a new user project"""
@@ -559,10 +829,14 @@ class DatabaseService:
         if "user_id" in project_data:
             project_data["user_id"] = str(project_data["user_id"])
 
-        response = self.client.table("user_projects").insert(project_data).execute()
+        response = await self._exec(
+            self.client.table("user_projects").insert(project_data)
+        )
 
         if response.data:
-            return Project(**response.data[0])
+            project = Project(**response.data[0])
+            self._invalidate_project_caches(user_id=project.user_id)
+            return project
         else:
             raise Exception("Failed to create user project")
 
@@ -570,55 +844,72 @@ class DatabaseService:
         self, project_id: UUID, update_data: dict
     ) -> Project | None:
         """Update a user project"""
-        response = (
+        response = await self._exec(
             self.client.table("user_projects")
             .update(update_data)
             .eq("id", str(project_id))
-            .execute()
         )
+        self._invalidate_project_caches(project_id=project_id)
         if response.data:
-            return Project(**response.data[0])
+            project = Project(**response.data[0])
+            self._invalidate_project_caches(user_id=project.user_id)
+            return project
         return None
 
     async def get_project_by_id(self, project_id: UUID) -> Project | None:
         """Get a specific user project by ID"""
-        response = (
+        cached = self._project_cache.get(str(project_id))
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
+        response = await self._exec(
             self.client.table("user_projects")
             .select("*")
             .eq("id", str(project_id))
-            .execute()
         )
         if response.data:
-            return Project(**response.data[0])
+            project = Project(**response.data[0])
+            self._project_cache.set(str(project_id), project)
+            return project.model_copy(deep=True)
         return None
 
+    async def project_exists(self, project_id: UUID) -> bool:
+        """Check that a project exists without loading it"""
+        if self._project_cache.get(str(project_id)) is not None:
+            return True
+        return await self._exists("user_projects", "id", str(project_id))
+
     async def delete_project(self, project_id: UUID) -> bool:
         """Delete a user project"""
-        response = (
+        response = await self._exec(
             self.client.table("user_projects")
             .delete()
             .eq("id", str(project_id))
-            .execute()
         )
+        self._invalidate_project_caches(project_id=project_id)
+        # Deleting a project clears project_id on its conversations
+        self._conversation_cache.clear()
+        for row in response.data:
+            self._invalidate_project_caches(user_id=row.get("user_id"))
         return len(response.data) > 0
 
     async def get_project_conversations(self, project_id: UUID) -> list[Conversation]:
         """Get all conversations for a specific project"""
-        response = (
+        response = await self._exec(
             self.client.table("conversations")
-            .select("*")
+            # The project's conversation list also shows each project_context
+            .select(f"{_CONVERSATION_LIST_COLUMNS},project_context")
             .eq("project_id", str(project_id))
             .order("updated_at", desc=True)
-            .execute()
         )
-        return [Conversation(**item) for item in response.data]
+        return _CONVERSATION_LIST.validate_python(response.data)
 
     # Prompt Template operations
     async def create_prompt_template(
         self, template_data: PromptTemplateCreate, created_by: UUID
     ) -> PromptTemplate:
         """Create a new prompt template"""
-        response = (
+        response = await self._exec(
             self.client.table("prompt_templates")
             .insert(
                 {
@@ -630,13 +921,26 @@ class DatabaseService:
                     "template_type": template_data.template_type.value,
                 }
             )
-            .execute()
         )
 
+        self._templates_cache.clear()
         if response.data:
             return PromptTemplate(**response.data[0])
         raise Exception("Failed to create prompt template")
 
+    async def _get_all_prompt_templates(self) -> list[PromptTemplate]:
+        """Every prompt template, newest first (cached; callers must not mutate them)"""
+        templates = self._templates_cache.get("all")
+        if templates is None:
+            response = await self._exec(
+                self.client.table("prompt_templates")
+                .select("*")
+                .order("created_at", desc=True)
+            )
+            templates = _PROMPT_TEMPLATE_LIST.validate_python(response.data)
+            self._templates_cache.set("all", templates)
+        return templates
+
     async def get_prompt_templates(
         self,
         active_only: bool = True,
@@ -644,39 +948,32 @@ class DatabaseService:
         user_id: UUID | None = None,
     ) -> list[PromptTemplate]:
         """Get prompt templates with optional filtering by type and user"""
-        query = self.client.table("prompt_templates").select("*")
-
-        if active_only:
-            query = query.eq("is_active", True)
-
-        if template_type:
-            query = query.eq("template_type", template_type)
-
-        if user_id:
-            query = query.eq("created_by", str(user_id))
-
-        response = query.order("created_at", desc=True).execute()
-        return [PromptTemplate(**item) for item in response.data]
+        created_by = str(user_id) if user_id else None
+        return [
+            template.model_copy(deep=True)
+            for template in await self._get_all_prompt_templates()
+            if (not active_only or template.is_active)
+            and (not template_type or template.template_type == template_type)
+            and (created_by is None or str(template.created_by) == created_by)
+        ]
 
     async def get_prompt_template_by_id(
         self, template_id: UUID
     ) -> PromptTemplate | None:
         """Get a specific prompt template by ID"""
-        response = (
-            self.client.table("prompt_templates")
-            .select("*")
-            .eq("id", str(template_id))
-            .execute()
-        )
-
-        if response.data:
-            return PromptTemplate(**response.data[0])
+        template_id = str(template_id)
+        for template in await self._get_all_prompt_templates():
+            if str(template.id) == template_id:
+                return template.model_copy(deep=True)
         return None
 
     async def update_prompt_template(
-        self, template_id: UUID, template_data: PromptTemplateUpdate
+        self,
+        template_id: UUID,
+        template_data: PromptTemplateUpdate,
+        current: PromptTemplate | None = None,
     ) -> PromptTemplate | None:
-        """Update a prompt template"""
+        """Update a prompt template (`current`, if loaded, is returned for empty updates)"""
         update_dict = {}
         if template_data.title is not None:
             update_dict["title"] = template_data.title
@@ -690,14 +987,15 @@ class DatabaseService:
             update_dict["template_type"] = template_data.template_type.value
 
         if not update_dict:
-            return await self.get_prompt_template_by_id(template_id)
+            # No fields changed: skip the write, and the read if the caller has the row
+            return current or await self.get_prompt_template_by_id(template_id)
 
-        response = (
+        response = await self._exec(
             self.client.table("prompt_templates")
             .update(update_dict)
             .eq("id", str(template_id))
-            .execute()
         )
+        self._templates_cache.clear()
 
         if response.data:
             return PromptTemplate(**response.data[0])
@@ -705,23 +1003,22 @@ class DatabaseService:
 
     async def delete_prompt_template(self, template_id: UUID) -> bool:
         """Delete a prompt template (admin only)"""
-        response = (
+        response = await self._exec(
             self.client.table("prompt_templates")
-            .delete()
+            .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
             .eq("id", str(template_id))
-            .execute()
         )
-        return len(response.data) > 0
+        self._templates_cache.clear()
+        return (response.count or 0) > 0
 
     async def can_user_modify_template(self, template_id: UUID, user_id: UUID) -> bool:
         """Check if user can modify a template (owns it or is admin modifying admin template)"""
-        template = await self.get_prompt_template_by_id(template_id)
-        if not template:
-            return False
-
-        # Get user info to check admin status
-        user = await self.get_user_by_id(user_id)
-        if not user:
+        # Load the template and the user (for admin status) together
+        template, user = await asyncio.gather(
+            self.get_prompt_template_by_id(template_id),
+            self.get_user_by_id(user_id),
+        )
+        if not template or not user:
             return False
 
         # Users can modify their own user templates
@@ -738,75 +1035,73 @@ class DatabaseService:
         self, tags: list[str], active_only: bool = True
     ) -> list[PromptTemplate]:
         """Get prompt templates that contain any of the specified tags"""
-        query = self.client.table("prompt_templates").select("*")
-
-        if active_only:
-            query = query.eq("is_active", True)
-
-        # Use overlap operator to find templates with any matching tags
-        if tags:
-            query = query.filter("tags", "ov", tags)
-
-        response = query.order("created_at", desc=True).execute()
-        return [PromptTemplate(**item) for item in response.data]
+        wanted_tags = set(tags)
+        return [
+            template.model_copy(deep=True)
+            for template in await self._get_all_prompt_templates()
+            if (not active_only or template.is_active)
+            # Any overlapping tag matches (same as the Postgres && operator)
+            and (not wanted_tags or not wanted_tags.isdisjoint(template.tags))
+        ]
 
     # File-Conversation relationship operations
     async def add_file_to_conversation(
         self, file_id: UUID, conversation_id: UUID
     ) -> bool:
         """Add a file to a conversation (creates file_conversations relationship)"""
-        try:
-            response = (
-                self.client.table("file_conversations")
-                .insert(
-                    {"file_id": str(file_id), "conversation_id": str(conversation_id)}
-                )
-                .execute()
+        # An existing (file_id, conversation_id) pair is skipped by the UNIQUE constraint
+        await self._exec(
+            self.client.table("file_conversations").upsert(
+                {"file_id": str(file_id), "conversation_id": str(conversation_id)},
+                on_conflict="file_id,conversation_id",
+                ignore_duplicates=True,
+                returning=ReturnMethod.minimal,
             )
-            return len(response.data) > 0
-        except Exception:
-            # Relationship might already exist due to UNIQUE constraint
-            return True
+        )
+        # Either newly linked or already linked
+        return True
+
+    @staticmethod
+    def _file_conversation_entry(item: dict) -> dict:
+        """Shape a file_conversations row (with embedded conversation) for the files API"""
+        return {
+            "conversation_id": item["conversation_id"],
+            "conversation_title": item["conversations"]["title"]
+            if item["conversations"]
+            else "Untitled",
+            "used_at": item["created_at"],
+        }
 
     async def get_file_conversations(self, file_id: UUID) -> list[dict]:
         """Get all conversations where a file has been used"""
-        response = (
+        response = await self._exec(
             self.client.table("file_conversations")
             .select("conversation_id, created_at, conversations(id, title)")
             .eq("file_id", str(file_id))
             .order("created_at", desc=True)
-            .execute()
         )
 
-        return [
-            {
-                "conversation_id": item["conversation_id"],
-                "conversation_title": item["conversations"]["title"]
-                if item["conversations"]
-                else "Untitled",
-                "used_at": item["created_at"],
-            }
-            for item in response.data
-        ]
+        return [self._file_conversation_entry(item) for item in response.data]
 
     async def get_user_files_with_conversations(self, user_id: UUID) -> list[dict]:
         """Get all user files with their conversation usage data"""
-        # First get all user files
-        files_response = (
+        # Files and their conversation links come back embedded in one query
+        files_response = await self._exec(
             self.client.table("user_files")
-            .select("*")
+            .select("*, file_conversations(conversation_id, created_at, conversations(id, title))")
             .eq("user_id", str(user_id))
             .order("created_at", desc=True)
-            .execute()
+            .order("created_at", desc=True, foreign_table="file_conversations")
         )
 
         files_with_conversations = []
         for file_data in files_response.data:
+            conversations_data = [
+                self._file_conversation_entry(item)
+                for item in file_data.pop("file_conversations", None) or []
+            ]
             file_obj = UserFile(**file_data)
 
-            # Get conversation data for this file
-            conversations_data = await self.get_file_conversations(file_obj.id)
-
             files_with_conversations.append(
                 {
                     **file_obj.model_dump(),
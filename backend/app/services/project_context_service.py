@@ -9,7 +9,7 @@ from uuid import UUID
 from pydantic import BaseModel
 from agents import Agent, function_tool, RunContextWrapper
 
-from app.models.database import ProjectType, ProjectStage
+from app.models.database import Project, ProjectType, ProjectStage
 from app.services.database import db_service
 
 
@@ -32,27 +32,20 @@ class ProjectContext(BaseModel):
     context_data: Dict[str, Any] = {}
 
     @classmethod
-    async def from_user_id(cls, user_id: UUID) -> "ProjectContext":
-        """Load project context from database for a user"""
-        # Get user information to include name
-        user = await db_service.get_user_by_id(user_id)
-        user_name = user.name if user and user.name else None
-        
-        projects = await db_service.get_user_projects(user_id)
-        
-        if not projects:
+    def from_project(
+        cls, user_id: UUID, user_name: str | None, project: Project | None
+    ) -> "ProjectContext":
+        """Build project context from an already loaded project (or none)"""
+        if not project:
             # Return empty context for users without projects
             return cls(user_id=str(user_id), user_name=user_name)
-        
-        # Use the first project (users typically have one main project)
-        project = projects[0]
-        
+
         # Extract dynamic data from context_data
         context_data = project.context_data or {}
         key_challenges = context_data.get("key_challenges", [])
         recent_activities = context_data.get("recent_activities", [])
         goals = context_data.get("goals", [])
-        
+
         return cls(
             user_id=str(user_id),
             user_name=user_name,
@@ -70,6 +63,18 @@ class ProjectContext(BaseModel):
             context_data=context_data
         )
 
+    @classmethod
+    async def from_user_id(cls, user_id: UUID) -> "ProjectContext":
+        """Load project context from database for a user"""
+        # Get user information to include name
+        user = await db_service.get_user_by_id(user_id)
+        user_name = user.name if user and user.name else None
+        
+        projects = await db_service.get_user_projects(user_id)
+        
+        # Use the first project (users typically have one main project)
+        return cls.from_project(user_id, user_name, projects[0] if projects else None)
+
     async def save_to_database(self) -> bool:
         """Save updated context back to database"""
         try:
@@ -98,7 +103,7 @@ class ProjectContext(BaseModel):
             
             if projects:
                 # Update existing project
-                await db_service.update_user_project(projects[0].id, update_data)
+                await db_service.update_project(projects[0].id, update_data)
             else:
                 # Create new project
                 update_data["user_id"] = user_uuid
@@ -110,10 +115,7 @@ class ProjectContext(BaseModel):
             return False
 
 
-def create_base_personality_instructions() -> str:
-    """Generate base personality instructions for all Ignacio agents"""
-    print("[PROJECT_CONTEXT] Creating base personality instructions")
-    return """You are Ignacio, a seasoned entrepreneur and mentor for Action Lab participants.
+BASE_PERSONALITY_INSTRUCTIONS = """You are Ignacio, a seasoned entrepreneur and mentor for Action Lab participants.
 
     BE SURE TO USE THE TOOLS AT YOUR DISPOSAL.
 
@@ -183,55 +185,74 @@ Remember: Be their thinking partner for strategy, their assistant for tasks, and
 """
 
 
-def create_project_aware_instructions(
-    run_context: RunContextWrapper[ProjectContext],
-    agent: Agent[ProjectContext]
-) -> str:
-    """Generate dynamic instructions based on user project context"""
-    context = run_context.context
+# Ordered from most to least stable (fixed guidelines, project identity, then
+# recent activity) so instruction prefixes stay cacheable across turns
+_PROJECT_CONTEXT_TEMPLATE = """
+PERSONALIZATION GUIDELINES:
+- Always reference their specific project when relevant
+- Tailor advice to their current project stage and type
+- Address their stated challenges and goals
+- Build upon their existing solution approach
+- Consider their target audience in recommendations
 
-    base_instructions = create_base_personality_instructions()
-    
-    if context.project_name:
-        project_context = f"""
 USER PROJECT CONTEXT:
-- User Name: {context.user_name or 'Not provided'}
-- Project: {context.project_name}
-- Type: {context.project_type.value if context.project_type else 'Not specified'}
-- Stage: {context.current_stage.value if context.current_stage else 'Not specified'}
-- Description: {context.description or 'Not provided'}
+- User Name: {user_name}
+- Project: {project_name}
+- Type: {project_type}
+- Stage: {current_stage}
+- Description: {description}
 
-TARGET AUDIENCE: {context.target_audience or 'Not specified'}
+TARGET AUDIENCE: {target_audience}
 
-PROBLEM STATEMENT: {context.problem_statement or 'Not specified'}
+PROBLEM STATEMENT: {problem_statement}
 
-SOLUTION APPROACH: {context.solution_approach or 'Not specified'}
+SOLUTION APPROACH: {solution_approach}
 
-BUSINESS MODEL: {context.business_model or 'Not specified'}
+BUSINESS MODEL: {business_model}
 
-KEY CHALLENGES: {', '.join(context.key_challenges) if context.key_challenges else 'None specified'}
+KEY CHALLENGES: {key_challenges}
 
-CURRENT GOALS: {', '.join(context.goals) if context.goals else 'None specified'}
+CURRENT GOALS: {goals}
 
-RECENT ACTIVITIES: {', '.join(context.recent_activities[-3:]) if context.recent_activities else 'None recorded'}
+RECENT ACTIVITIES: {recent_activities}
+""".format
 
-PERSONALIZATION GUIDELINES:
-- Always reference their specific project when relevant
-- Tailor advice to their current project stage and type
-- Address their stated challenges and goals
-- Build upon their existing solution approach
-- Consider their target audience in recommendations
-"""
-    else:
-        project_context = f"""
+_NO_PROJECT_CONTEXT_TEMPLATE = """
 USER PROJECT CONTEXT:
-- User Name: {context.user_name or 'Not provided'}
+- User Name: {user_name}
 - No project information available yet
 - Help them define their project by asking about their idea, goals, and challenges
 - Guide them through the Action Lab project development process
-"""
-    
-    return base_instructions + project_context
+""".format
+
+
+def render_project_context(context: ProjectContext) -> str:
+    """Render the user/project block appended to agent instructions"""
+    if not context.project_name:
+        return _NO_PROJECT_CONTEXT_TEMPLATE(user_name=context.user_name or 'Not provided')
+
+    return _PROJECT_CONTEXT_TEMPLATE(
+        user_name=context.user_name or 'Not provided',
+        project_name=context.project_name,
+        project_type=context.project_type.value if context.project_type else 'Not specified',
+        current_stage=context.current_stage.value if context.current_stage else 'Not specified',
+        description=context.description or 'Not provided',
+        target_audience=context.target_audience or 'Not specified',
+        problem_statement=context.problem_statement or 'Not specified',
+        solution_approach=context.solution_approach or 'Not specified',
+        business_model=context.business_model or 'Not specified',
+        key_challenges=', '.join(context.key_challenges) if context.key_challenges else 'None specified',
+        goals=', '.join(context.goals) if context.goals else 'None specified',
+        recent_activities=', '.join(context.recent_activities[-3:]) if context.recent_activities else 'None recorded',
+    )
+
+
+def create_project_aware_instructions(
+    run_context: RunContextWrapper[ProjectContext],
+    agent: Agent[ProjectContext]
+) -> str:
+    """Generate dynamic instructions based on user project context"""
+    return BASE_PERSONALITY_INSTRUCTIONS + render_project_context(run_context.context)
 
 
 def create_domain_specific_instructions(domain: str) -> str:
@@ -381,61 +402,19 @@ class ProjectContextService:
 
         if domain:
             print(f"[PROJECT_CONTEXT] Creating domain-specific agent for {domain}")
+            # Base personality and domain instructions never change for an agent,
+            # so build that prefix once instead of on every run
+            static_prefix = (
+                BASE_PERSONALITY_INSTRUCTIONS + "\n\n"
+                + create_domain_specific_instructions(domain) + "\n\n"
+            )
+
             # Create combined instructions function for domain-specific agents
             def combined_instructions(
                 run_context: RunContextWrapper[ProjectContext],
                 agent: Agent[ProjectContext]
             ) -> str:
-                context = run_context.context
-                print(f"[PROJECT_CONTEXT] Generating combined instructions for {agent_name} ({domain})")
-
-                # Get base personality and domain-specific instructions
-                base_personality = create_base_personality_instructions()
-                domain_specific = create_domain_specific_instructions(domain)
-
-                # Add project context (similar to create_project_aware_instructions but without duplicating base personality)
-                if context.project_name:
-                    project_context = f"""
-USER PROJECT CONTEXT:
-- User Name: {context.user_name or 'Not provided'}
-- Project: {context.project_name}
-- Type: {context.project_type.value if context.project_type else 'Not specified'}
-- Stage: {context.current_stage.value if context.current_stage else 'Not specified'}
-- Description: {context.description or 'Not provided'}
-
-TARGET AUDIENCE: {context.target_audience or 'Not specified'}
-
-PROBLEM STATEMENT: {context.problem_statement or 'Not specified'}
-
-SOLUTION APPROACH: {context.solution_approach or 'Not specified'}
-
-BUSINESS MODEL: {context.business_model or 'Not specified'}
-
-KEY CHALLENGES: {', '.join(context.key_challenges) if context.key_challenges else 'None specified'}
-
-CURRENT GOALS: {', '.join(context.goals) if context.goals else 'None specified'}
-
-RECENT ACTIVITIES: {', '.join(context.recent_activities[-3:]) if context.recent_activities else 'None recorded'}
-
-PERSONALIZATION GUIDELINES:
-- Always reference their specific project when relevant
-- Tailor advice to their current project stage and type
-- Address their stated challenges and goals
-- Build upon their existing solution approach
-- Consider their target audience in recommendations
-"""
-                else:
-                    project_context = f"""
-USER PROJECT CONTEXT:
-- User Name: {context.user_name or 'Not provided'}
-- No project information available yet
-- Help them define their project by asking about their idea, goals, and challenges
-- Guide them through the Action Lab project development process
-"""
-
-                combined = base_personality + "\n\n" + domain_specific + "\n\n" + project_context
-                print(f"[PROJECT_CONTEXT] Combined instructions: {len(combined)} total characters")
-                return combined
+                return static_prefix + render_project_context(run_context.context)
 
             agent = Agent[ProjectContext](
                 name=agent_name,
@@ -0,0 +1,109 @@
+"""
+Semantic Response Cache for Ignacio Bot
+Serves previously generated answers for near-identical questions asked by the
+same user about the same project, skipping the agent run for FAQ-style repeats
+"""
+
+import hashlib
+import math
+import time
+from collections.abc import Hashable, Sequence
+from operator import mul
+from typing import NamedTuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.openai_client import openai_client
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+class CachedResponse(NamedTuple):
+    embedding: list[float]
+    response: str
+    expires_at: float
+
+
+class SemanticCacheLookup(NamedTuple):
+    """Result of a cache lookup; carries the query embedding so a miss can be stored without re-embedding"""
+    scope: Hashable
+    embedding: list[float]
+    response: str | None
+
+
+def _normalize(vector: Sequence[float]) -> list[float]:
+    norm = math.sqrt(sum(map(mul, vector, vector))) or 1.0
+    return [value / norm for value in vector]
+
+
+class SemanticResponseCache:
+    """Per-scope store of query embedding -> response, matched by cosine similarity"""
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        ttl: float = 3600,
+        max_entries_per_scope: int = 100,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries_per_scope = max_entries_per_scope
+        self.openai_client = openai_client
+        self._entries = TTLCache(maxsize=10_000, ttl=ttl)
+        # Question text -> normalized embedding, so repeated turns aren't re-embedded
+        self._embeddings = TTLCache(maxsize=10_000, ttl=24 * 60 * 60)
+
+    async def _embed(self, text: str) -> list[float]:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        embedding = self._embeddings.get(key)
+        if embedding is None:
+            response = await self.openai_client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=text,
+            )
+            embedding = _normalize(response.data[0].embedding)
+            self._embeddings.set(key, embedding)
+        return embedding
+
+    async def lookup(
+        self,
+        scope: Hashable,
+        query: str,
+    ) -> SemanticCacheLookup:
+        """Find a cached response for a semantically equivalent query in the same scope"""
+        embedding = await self._embed(query)
+
+        now = time.monotonic()
+        best_score, best_response = self.threshold, None
+        for entry in self._entries.get(scope, ()):
+            if entry.expires_at <= now:
+                continue
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            score = sum(map(mul, embedding, entry.embedding))
+            if score >= best_score:
+                best_score, best_response = score, entry.response
+
+        return SemanticCacheLookup(scope, embedding, best_response)
+
+    def store(self, lookup: SemanticCacheLookup, response: str) -> None:
+        """Remember the response generated for a missed lookup"""
+        now = time.monotonic()
+        entries = [
+            entry for entry in self._entries.get(lookup.scope, ())
+            if entry.expires_at > now
+        ]
+        entries.append(
+            CachedResponse(lookup.embedding, response, now + self.ttl)
+        )
+        self._entries.set(lookup.scope, entries[-self.max_entries_per_scope:])
+
+
+# Global cache instance (None when disabled in settings)
+response_cache = (
+    SemanticResponseCache(
+        threshold=settings.semantic_cache_threshold,
+        ttl=settings.semantic_cache_ttl,
+    )
+    if settings.semantic_cache_enabled
+    else None
+)
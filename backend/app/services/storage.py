@@ -3,6 +3,7 @@ Supabase Storage service for Ignacio Bot
 Handles file uploads, downloads, and management via Supabase Storage
 """
 
+import asyncio
 import mimetypes
 import uuid
 from uuid import UUID
@@ -146,11 +147,14 @@ class StorageService:
         except Exception as e:
             raise Exception(f"File upload failed: {e}")
 
-    async def download_file(self, file_id: UUID, user_id: UUID) -> bytes | None:
-        """Download a file from Supabase Storage"""
+    async def download_file(
+        self, file_id: UUID, user_id: UUID, file_record: UserFile | None = None
+    ) -> bytes | None:
+        """Download a file from Supabase Storage (pass `file_record` if the caller already loaded it)"""
 
         # Get file record from database
-        file_record = await db_service.get_file_by_id(file_id)
+        if file_record is None:
+            file_record = await db_service.get_file_by_id(file_id)
         if not file_record or file_record.user_id != user_id:
             return None
 
@@ -216,7 +220,11 @@ class StorageService:
     async def get_file_content(self, file_path: str) -> bytes:
         """Get file content as bytes for OpenAI upload"""
         try:
-            response = self.client.storage.from_(self.bucket_name).download(file_path)
+            # The storage client is synchronous; download in a worker thread so
+            # several attachments can be fetched concurrently
+            response = await asyncio.to_thread(
+                self.client.storage.from_(self.bucket_name).download, file_path
+            )
             return response
         except Exception as e:
             print(f"Failed to get file content: {e}")
@@ -0,0 +1,6 @@
+-- Migration 013: Add composite index for recent-message lookups
+-- Supports ORDER BY created_at DESC LIMIT n queries scoped to one conversation
+-- (used to load the rolling history window on every chat turn)
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created_at
+    ON messages(conversation_id, created_at DESC);
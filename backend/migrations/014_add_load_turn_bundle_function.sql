@@ -0,0 +1,46 @@
+-- Migration 014: Add load_turn_bundle RPC
+-- Loads everything a chat turn needs in a single round-trip:
+-- the conversation, the user's name, the project used for context
+-- (the conversation's project, or the user's latest project as fallback),
+-- the newest messages (oldest first) and the total message count.
+
+CREATE OR REPLACE FUNCTION load_turn_bundle(
+    p_conversation_id UUID,
+    p_message_limit INTEGER DEFAULT 10
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'conversation', to_jsonb(c),
+        'user_name', u.name,
+        'project', to_jsonb(p),
+        'recent_messages', COALESCE((
+            SELECT jsonb_agg(to_jsonb(m) ORDER BY m.created_at ASC)
+            FROM (
+                SELECT *
+                FROM messages
+                WHERE conversation_id = c.id
+                ORDER BY created_at DESC
+                LIMIT p_message_limit
+            ) m
+        ), '[]'::jsonb),
+        'message_count', (
+            SELECT COUNT(*) FROM messages WHERE conversation_id = c.id
+        )
+    )
+    FROM conversations c
+    LEFT JOIN users u ON u.id = c.user_id
+    LEFT JOIN LATERAL (
+        SELECT *
+        FROM user_projects up
+        WHERE (c.project_id IS NOT NULL AND up.id = c.project_id)
+           OR (c.project_id IS NULL AND up.user_id = c.user_id)
+        ORDER BY up.created_at DESC
+        LIMIT 1
+    ) p ON TRUE
+    WHERE c.id = p_conversation_id;
+$$;
+
+COMMENT ON FUNCTION load_turn_bundle(UUID, INTEGER) IS 'Returns conversation, user name, context project and recent messages for one chat turn';
@@ -0,0 +1,65 @@
+-- Migration 015: Add conversation history condensation
+-- Older messages are summarized into a single summary message by the
+-- ConversationCondenser. Summarized originals are kept for the UI but marked
+-- condensed so they are no longer replayed to the agent.
+
+ALTER TABLE messages
+ADD COLUMN is_summary BOOLEAN NOT NULL DEFAULT FALSE,
+ADD COLUMN condensed BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Replayed history only ever reads non-condensed rows
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_active
+    ON messages(conversation_id, created_at DESC)
+    WHERE NOT condensed;
+
+COMMENT ON COLUMN messages.is_summary IS 'True for condenser-generated summaries of earlier messages (hidden from the chat UI)';
+COMMENT ON COLUMN messages.condensed IS 'True once the message has been folded into a summary (no longer replayed to the agent)';
+
+-- load_turn_bundle now skips condensed messages and returns the latest summary separately
+CREATE OR REPLACE FUNCTION load_turn_bundle(
+    p_conversation_id UUID,
+    p_message_limit INTEGER DEFAULT 10
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'conversation', to_jsonb(c),
+        'user_name', u.name,
+        'project', to_jsonb(p),
+        'summary', (
+            SELECT content
+            FROM messages
+            WHERE conversation_id = c.id AND is_summary AND NOT condensed
+            ORDER BY created_at DESC
+            LIMIT 1
+        ),
+        'recent_messages', COALESCE((
+            SELECT jsonb_agg(to_jsonb(m) ORDER BY m.created_at ASC)
+            FROM (
+                SELECT *
+                FROM messages
+                WHERE conversation_id = c.id AND NOT condensed AND NOT is_summary
+                ORDER BY created_at DESC
+                LIMIT p_message_limit
+            ) m
+        ), '[]'::jsonb),
+        'message_count', (
+            SELECT COUNT(*)
+            FROM messages
+            WHERE conversation_id = c.id AND NOT condensed AND NOT is_summary
+        )
+    )
+    FROM conversations c
+    LEFT JOIN users u ON u.id = c.user_id
+    LEFT JOIN LATERAL (
+        SELECT *
+        FROM user_projects up
+        WHERE (c.project_id IS NOT NULL AND up.id = c.project_id)
+           OR (c.project_id IS NULL AND up.user_id = c.user_id)
+        ORDER BY up.created_at DESC
+        LIMIT 1
+    ) p ON TRUE
+    WHERE c.id = p_conversation_id;
+$$;
@@ -0,0 +1,7 @@
+-- Migration 016: Distinct created_at for messages inserted in one statement
+-- NOW() is the transaction start time, so a user message and the AI reply
+-- written by a single bulk insert would share a timestamp and lose their
+-- order. clock_timestamp() advances for every row.
+
+ALTER TABLE messages
+ALTER COLUMN created_at SET DEFAULT clock_timestamp();
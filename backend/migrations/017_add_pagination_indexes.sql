@@ -0,0 +1,13 @@
+-- Migration 017: Add composite indexes matching the list endpoints' ORDER BY
+-- Lets "WHERE owner = ? [AND ts < cursor] ORDER BY ts DESC LIMIT n" read the
+-- index in order instead of sorting every row of the owner
+-- (messages are already covered by idx_messages_conversation_created_at, 013)
+
+CREATE INDEX IF NOT EXISTS idx_conversations_user_updated_at
+    ON conversations(user_id, updated_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_user_files_user_created_at
+    ON user_files(user_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_users_created_at
+    ON users(created_at DESC);
@@ -0,0 +1,28 @@
+-- Migration 018: Add consume_otp RPC
+-- Verifies and marks an OTP code as used in one atomic statement, so a code
+-- can't be accepted twice by concurrent requests and verification costs a
+-- single round-trip. Returns the consumed code, or no rows if none is valid.
+
+CREATE OR REPLACE FUNCTION consume_otp(
+    p_phone_number TEXT,
+    p_code TEXT
+)
+RETURNS SETOF otp_codes
+LANGUAGE sql
+VOLATILE
+AS $$
+    UPDATE otp_codes
+    SET is_used = true
+    WHERE id = (
+        SELECT id
+        FROM otp_codes
+        WHERE phone_number = p_phone_number
+          AND code = p_code
+          AND is_used = false
+          AND expires_at > NOW()
+        ORDER BY created_at DESC
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$;
@@ -0,0 +1,57 @@
+"""
+Tests for the in-process TTL cache
+"""
+
+from unittest.mock import patch
+
+from app.core.cache import TTLCache
+
+
+class TestTTLCache:
+    """Test TTLCache expiry, LRU eviction and invalidation"""
+
+    def test_get_returns_stored_value(self):
+        """Test a stored entry is returned until it expires"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", "value")
+
+        assert cache.get("key") == "value"
+        assert "key" in cache
+        assert cache.get("missing", "default") == "default"
+
+    def test_entries_expire_after_ttl(self):
+        """Test entries are dropped once their time-to-live has passed"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        with patch("app.core.cache.time.monotonic", return_value=1000.0):
+            cache.set("key", "value")
+
+        with patch("app.core.cache.time.monotonic", return_value=1059.0):
+            assert cache.get("key") == "value"
+        with patch("app.core.cache.time.monotonic", return_value=1060.0):
+            assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the least recently used entry goes first when the cache is full"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now the least recently used
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_pop_and_clear_invalidate_entries(self):
+        """Test pop removes one entry and clear removes all of them"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.pop("a") == 1
+        assert cache.pop("a", "gone") == "gone"
+        assert cache.get("a") is None
+
+        cache.clear()
+        assert len(cache) == 0
@@ -0,0 +1,132 @@
+"""
+Tests for ConversationCondenser
+"""
+
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.models.database import Message, MessageType
+from app.services import conversation_condenser as condenser_module
+from app.services.conversation_condenser import ConversationCondenser
+
+START = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def _messages(count: int, summary: bool = False) -> list[Message]:
+    """Alternating user/assistant messages (preceded by a summary row if requested)"""
+    conversation_id, user_id = uuid4(), uuid4()
+    messages = [
+        Message(
+            id=uuid4(),
+            conversation_id=conversation_id,
+            user_id=user_id,
+            content=f"Message {i}",
+            message_type=MessageType.TEXT,
+            is_from_user=i % 2 == 0,
+            created_at=START + timedelta(minutes=i + 1),
+        )
+        for i in range(count)
+    ]
+    if summary:
+        messages.insert(
+            0,
+            Message(
+                id=uuid4(),
+                conversation_id=conversation_id,
+                user_id=user_id,
+                content="Earlier summary",
+                message_type=MessageType.TEXT,
+                is_from_user=False,
+                is_summary=True,
+                created_at=START,
+            ),
+        )
+    return messages
+
+
+@pytest.fixture
+def mock_db():
+    """db_service as seen by the condenser"""
+    with patch.object(condenser_module, "db_service") as db:
+        db.create_summary_message = AsyncMock(return_value="summary-row")
+        db.mark_messages_condensed = AsyncMock(side_effect=lambda ids: len(ids))
+        yield db
+
+
+@pytest.fixture
+def condenser() -> ConversationCondenser:
+    """Condenser whose summarization call is stubbed"""
+    condenser = ConversationCondenser()
+    condenser._summarize = AsyncMock(return_value="New summary")
+    return condenser
+
+
+class TestConversationCondenser:
+    """Test folding overflow history into a single summary"""
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_condense_within_window(self, condenser, mock_db):
+        """Test conversations that fit the window are left alone"""
+        mock_db.get_uncondensed_messages = AsyncMock(return_value=_messages(20))
+
+        assert await condenser.condense(uuid4(), keep_recent=20) is None
+        condenser._summarize.assert_not_awaited()
+        mock_db.mark_messages_condensed.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_condenses_all_but_recent_messages(self, condenser, mock_db):
+        """Test everything older than the last `keep_recent` messages is summarized"""
+        messages = _messages(25)
+        mock_db.get_uncondensed_messages = AsyncMock(return_value=messages)
+        conversation_id = uuid4()
+
+        assert await condenser.condense(conversation_id, keep_recent=20) == "summary-row"
+
+        condensed = messages[:5]
+        condenser._summarize.assert_awaited_once_with(condensed)
+        mock_db.create_summary_message.assert_awaited_once_with(
+            conversation_id, condensed[-1].user_id, "New summary", condensed[-1].created_at
+        )
+        mock_db.mark_messages_condensed.assert_awaited_once_with([m.id for m in condensed])
+
+    @pytest.mark.asyncio
+    async def test_previous_summary_is_folded_in(self, condenser, mock_db):
+        """Test the existing summary row is merged and condensed with the overflow"""
+        messages = _messages(22, summary=True)
+        mock_db.get_uncondensed_messages = AsyncMock(return_value=messages)
+
+        await condenser.condense(uuid4(), keep_recent=20)
+
+        # The summary row doesn't count towards the kept window
+        condensed = messages[:3]
+        assert condensed[0].is_summary
+        condenser._summarize.assert_awaited_once_with(condensed)
+        mock_db.mark_messages_condensed.assert_awaited_once_with([m.id for m in condensed])
+
+    @pytest.mark.asyncio
+    async def test_empty_summary_leaves_messages_uncondensed(self, condenser, mock_db):
+        """Test a refusal or empty completion writes no summary and condenses nothing"""
+        mock_db.get_uncondensed_messages = AsyncMock(return_value=_messages(25))
+        condenser.openai_client = MagicMock()
+        condenser.openai_client.chat.completions.create = AsyncMock(
+            return_value=SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=None))]
+            )
+        )
+        del condenser._summarize  # use the real summarization call
+
+        assert await condenser.condense(uuid4(), keep_recent=20) is None
+        mock_db.create_summary_message.assert_not_awaited()
+        mock_db.mark_messages_condensed.assert_not_awaited()
+
+    def test_transcript_speakers(self):
+        """Test summaries and both sides of the conversation are labelled"""
+        summary, user_message, reply = _messages(2, summary=True)
+
+        assert ConversationCondenser._speaker(summary) == "Earlier summary"
+        assert ConversationCondenser._speaker(user_message) == "User"
+        assert ConversationCondenser._speaker(reply) == "Ignacio"
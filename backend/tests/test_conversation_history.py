@@ -0,0 +1,232 @@
+"""
+Tests for the conversation history replayed to the agent (window, summary, token budget)
+"""
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.models.database import (
+    Conversation,
+    ConversationTurnBundle,
+    Message,
+    MessageType,
+)
+from app.services import ai_service
+from app.services.ai_service import (
+    ContextBudgetExceededError,
+    ContextOptions,
+    IgnacioAgentService,
+    _estimate_content_tokens,
+)
+
+
+@pytest.fixture
+def agent_service() -> IgnacioAgentService:
+    """Agent service with the default window (20 messages, buffer of 5)"""
+    return IgnacioAgentService(ContextOptions(recent_messages=20, recent_message_cache_buffer=5))
+
+
+def _turns(count: int, chars: int = 40) -> list[dict]:
+    """Alternating user/assistant history items of `chars` characters each"""
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": str(i % 10) * chars}
+        for i in range(count)
+    ]
+
+
+class TestHistoryWindow:
+    """Test the cache-aligned history window"""
+
+    @pytest.mark.parametrize(
+        ("total_messages", "window_size"),
+        [(0, 0), (20, 20), (21, 21), (24, 24), (25, 20), (44, 24), (45, 20)],
+    )
+    def test_window_size(
+        self, agent_service: IgnacioAgentService, total_messages: int, window_size: int
+    ):
+        """Test the window grows to recent + buffer - 1 and then steps back to recent"""
+        assert agent_service._history_window_size(total_messages) == window_size
+
+
+class TestFitHistoryToBudget:
+    """Test trimming replayed history to the token budget"""
+
+    def test_history_within_budget_is_kept(self, agent_service: IgnacioAgentService):
+        """Test nothing is dropped when the history fits"""
+        history = _turns(4)  # 10 tokens each
+
+        assert agent_service._fit_history_to_budget(history, budget=40) == history
+
+    def test_oldest_turns_are_dropped_first(self, agent_service: IgnacioAgentService):
+        """Test the newest turns are kept, starting on a user turn"""
+        history = _turns(6)  # 10 tokens each
+
+        fitted = agent_service._fit_history_to_budget(history, budget=35)
+
+        # Three items fit, but the oldest of them is an assistant reply
+        assert fitted == history[4:]
+        assert fitted[0]["role"] == "user"
+
+    def test_summary_is_never_dropped(self, agent_service: IgnacioAgentService):
+        """Test the summary stays and its size counts against the budget"""
+        summary = {"role": "system", "content": "s" * 80}  # 20 tokens
+        history = [summary] + _turns(4)
+
+        fitted = agent_service._fit_history_to_budget(history, budget=45)
+
+        assert fitted == [summary] + history[3:]
+
+    def test_no_turns_fit(self, agent_service: IgnacioAgentService):
+        """Test an exhausted budget still keeps the summary"""
+        summary = {"role": "system", "content": "s" * 80}
+
+        assert agent_service._fit_history_to_budget([summary] + _turns(2), budget=20) == [summary]
+
+
+class TestTurnBudget:
+    """Test the size estimate and guard for the new turn"""
+
+    def test_file_id_counts_by_file_size(self):
+        """Test documents sent by file id are estimated from their size"""
+        content = [
+            {"type": "input_file", "file_id": "file-abc"},
+            {"type": "input_text", "text": "x" * 40},
+        ]
+
+        assert _estimate_content_tokens(content, {"file-abc": 64_000}) == 1000 + 10
+
+    @pytest.mark.asyncio
+    async def test_oversized_attachment_is_rejected(self, agent_service: IgnacioAgentService):
+        """Test a turn whose attached PDF alone exceeds the budget fails before the model call"""
+        pdf = b"%PDF" + b"\0" * (12 * 1024 * 1024)
+        file_input = {"type": "input_file", "file_id": "file-abc"}
+        run = AsyncMock()
+
+        with (
+            patch.object(agent_service, "_prepare_file_input", AsyncMock(return_value=file_input)),
+            patch.object(ai_service.Runner, "run", run),
+            pytest.raises(ContextBudgetExceededError),
+        ):
+            await agent_service._run_agent(
+                uuid4(), [], "Summarize this", None,
+                file_contents=[(pdf, "report.pdf", "application/pdf")],
+            )
+
+        run.assert_not_awaited()
+
+
+class TestSummaryReplay:
+    """Test the stored summary is replayed ahead of the history window"""
+
+    @pytest.mark.asyncio
+    async def test_summary_precedes_recent_messages(self, agent_service: IgnacioAgentService):
+        """Test continue_conversation sends the summary first, then the recent turns"""
+        conversation_id, user_id = uuid4(), uuid4()
+        now = datetime.now(UTC)
+        recent_messages = [
+            Message(
+                id=uuid4(),
+                conversation_id=conversation_id,
+                user_id=user_id,
+                content=f"Message {i}",
+                message_type=MessageType.TEXT,
+                is_from_user=i % 2 == 0,
+                created_at=now + timedelta(seconds=i),
+            )
+            for i in range(3)
+        ]
+        bundle = ConversationTurnBundle(
+            conversation=Conversation(
+                id=conversation_id, user_id=user_id, title="Chat", created_at=now, updated_at=now
+            ),
+            summary="The user is building a coffee shop.",
+            recent_messages=recent_messages,
+            message_count=3,
+        )
+        run_agent = AsyncMock(return_value="Reply")
+
+        with (
+            patch.object(ai_service.db_service, "load_turn_bundle", AsyncMock(return_value=bundle)),
+            patch.object(ai_service.db_service, "insert_messages", AsyncMock(return_value=2)),
+            patch.object(ai_service, "response_cache", None),
+            patch.object(agent_service, "_run_agent", run_agent),
+        ):
+            await agent_service.continue_conversation(conversation_id, "Next question")
+
+        history_messages = run_agent.await_args.args[1]
+        assert history_messages == [
+            {
+                "role": "system",
+                "content": "Summary of the earlier conversation:\nThe user is building a coffee shop.",
+            },
+            {"role": "user", "content": "Message 0"},
+            {"role": "assistant", "content": "Message 1"},
+            {"role": "user", "content": "Message 2"},
+        ]
+
+
+def _empty_bundle() -> ConversationTurnBundle:
+    """Turn bundle for a conversation with no history yet"""
+    now = datetime.now(UTC)
+    return ConversationTurnBundle(
+        conversation=Conversation(
+            id=uuid4(), user_id=uuid4(), title="Chat", created_at=now, updated_at=now
+        ),
+    )
+
+
+class TestTurnPersistence:
+    """Test when the turn's messages are written"""
+
+    @pytest.mark.asyncio
+    async def test_user_message_is_written_during_the_agent_run(
+        self, agent_service: IgnacioAgentService
+    ):
+        """Test the user insert starts before the agent runs and the reply joins it"""
+        bundle = _empty_bundle()
+        inserted: list[list] = []
+
+        async def insert_messages(messages):
+            inserted.append([message.is_from_user for message in messages])
+            return len(messages)
+
+        async def run_agent(*args):
+            await asyncio.sleep(0)  # the model call yields to the loop
+            # The user row is already being written while the model runs
+            assert inserted == [[True]]
+            return "Reply"
+
+        with (
+            patch.object(ai_service.db_service, "load_turn_bundle", AsyncMock(return_value=bundle)),
+            patch.object(ai_service.db_service, "insert_messages", side_effect=insert_messages),
+            patch.object(ai_service, "response_cache", None),
+            patch.object(agent_service, "_run_agent", side_effect=run_agent),
+        ):
+            await agent_service.continue_conversation(bundle.conversation.id, "Hola")
+
+        assert inserted == [[True], [False]]
+
+    @pytest.mark.asyncio
+    async def test_failed_run_still_stores_user_message(
+        self, agent_service: IgnacioAgentService
+    ):
+        """Test the user's message is stored even when the agent run fails"""
+        bundle = _empty_bundle()
+        insert_messages = AsyncMock(return_value=1)
+
+        with (
+            patch.object(ai_service.db_service, "load_turn_bundle", AsyncMock(return_value=bundle)),
+            patch.object(ai_service.db_service, "insert_messages", insert_messages),
+            patch.object(ai_service, "response_cache", None),
+            patch.object(agent_service, "_run_agent", AsyncMock(side_effect=RuntimeError("boom"))),
+            pytest.raises(RuntimeError),
+        ):
+            await agent_service.continue_conversation(bundle.conversation.id, "Hola")
+
+        insert_messages.assert_awaited_once()
+        (stored,) = insert_messages.await_args.args[0]
+        assert stored.is_from_user
@@ -2,7 +2,7 @@
 Tests for database service layer
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
 import pytest
@@ -158,6 +158,26 @@ class TestConversationOperations:
         assert conv1.id in conv_ids
         assert conv2.id in conv_ids
 
+    @pytest.mark.asyncio
+    async def test_get_user_conversations_with_message_counts(
+        self, test_user: User, test_conversation: Conversation
+    ):
+        """Test getting user conversations together with their message counts"""
+        for i in range(3):
+            msg_data = MessageCreate(
+                **TestDataFactory.message_data(
+                    test_conversation.id, test_user.id, content=f"Message {i}"
+                )
+            )
+            await db_service.create_message(msg_data)
+
+        conversations = await db_service.get_user_conversations_with_message_counts(
+            test_user.id
+        )
+
+        counts = {conv.id: count for conv, count in conversations}
+        assert counts[test_conversation.id] == 3
+
     @pytest.mark.asyncio
     async def test_get_conversation_by_id_success(
         self, test_conversation: Conversation
@@ -252,6 +272,92 @@ class TestMessageOperations:
 
         assert len(messages) <= 3
 
+    @pytest.mark.asyncio
+    async def test_get_conversation_messages_with_cursor(
+        self, test_user: User, test_conversation: Conversation
+    ):
+        """Test keyset pagination continues after the last message of a page"""
+        for i in range(5):
+            msg_data = MessageCreate(
+                **TestDataFactory.message_data(
+                    test_conversation.id, test_user.id, content=f"Message {i}"
+                )
+            )
+            await db_service.create_message(msg_data)
+
+        first_page = await db_service.get_conversation_messages(
+            test_conversation.id, limit=3
+        )
+        second_page = await db_service.get_conversation_messages(
+            test_conversation.id, limit=3, after=first_page[-1].created_at
+        )
+
+        assert [m.content for m in first_page + second_page] == [
+            f"Message {i}" for i in range(5)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_conversation_messages_cursor_breaks_timestamp_ties(
+        self, test_user: User, test_conversation: Conversation
+    ):
+        """Test the (created_at, id) cursor pages through messages sharing a timestamp"""
+        created_at = datetime.now(timezone.utc)
+        await db_service.insert_messages(
+            [
+                MessageCreate(
+                    **TestDataFactory.message_data(
+                        test_conversation.id,
+                        test_user.id,
+                        content=f"Message {i}",
+                        created_at=created_at,
+                    )
+                )
+                for i in range(4)
+            ]
+        )
+
+        first_page = await db_service.get_conversation_messages(
+            test_conversation.id, limit=2
+        )
+        second_page = await db_service.get_conversation_messages(
+            test_conversation.id,
+            limit=2,
+            after=first_page[-1].created_at,
+            after_id=first_page[-1].id,
+        )
+
+        assert len({m.id for m in first_page + second_page}) == 4
+
+    @pytest.mark.asyncio
+    async def test_insert_messages(
+        self, test_user: User, test_conversation: Conversation
+    ):
+        """Test storing messages without reading the rows back"""
+        reply_id = uuid4()
+        inserted = await db_service.insert_messages(
+            [
+                MessageCreate(
+                    **TestDataFactory.message_data(
+                        test_conversation.id, test_user.id, content="Question"
+                    )
+                ),
+                MessageCreate(
+                    **TestDataFactory.message_data(
+                        test_conversation.id,
+                        test_user.id,
+                        content="Answer",
+                        is_from_user=False,
+                        id=reply_id,
+                    )
+                ),
+            ]
+        )
+
+        assert inserted == 2
+        messages = await db_service.get_conversation_messages(test_conversation.id)
+        assert [msg.content for msg in messages] == ["Question", "Answer"]
+        assert messages[1].id == reply_id
+
 
 class TestOTPOperations:
     """Test OTP operations"""
@@ -286,6 +392,21 @@ class TestOTPOperations:
         assert verified_otp.phone_number == phone_number
         assert verified_otp.code == code
 
+    @pytest.mark.asyncio
+    async def test_verify_otp_is_single_use(self):
+        """Test a verified OTP can't be verified again"""
+        phone_number = "+1234567891"
+        code = "654321"
+        otp_data = OTPCodeCreate(**TestDataFactory.otp_data(phone_number, code=code))
+        await db_service.create_otp(otp_data)
+
+        first = await db_service.verify_otp(phone_number, code)
+        second = await db_service.verify_otp(phone_number, code)
+
+        assert first is not None
+        assert first.is_used is True
+        assert second is None
+
     @pytest.mark.asyncio
     async def test_verify_otp_invalid_code(self):
         """Test OTP verification with invalid code"""
@@ -446,3 +567,41 @@ class TestFileOperations:
         file = await db_service.get_file_by_id(non_existent_id)
 
         assert file is None
+
+    @pytest.mark.asyncio
+    async def test_get_user_files_with_conversations(
+        self, test_user: User, test_conversation: Conversation
+    ):
+        """Test files are returned with their embedded conversation usage"""
+        used_file = await db_service.create_user_file(
+            UserFileCreate(**TestDataFactory.user_file_data(test_user.id, file_name="used.pdf"))
+        )
+        unused_file = await db_service.create_user_file(
+            UserFileCreate(**TestDataFactory.user_file_data(test_user.id, file_name="unused.pdf"))
+        )
+        await db_service.add_file_to_conversation(used_file.id, test_conversation.id)
+
+        files = await db_service.get_user_files_with_conversations(test_user.id)
+        by_id = {f["id"]: f for f in files}
+
+        assert by_id[used_file.id]["usage_count"] == 1
+        assert by_id[used_file.id]["conversations"][0]["conversation_id"] == str(
+            test_conversation.id
+        )
+        assert by_id[unused_file.id]["usage_count"] == 0
+        assert by_id[unused_file.id]["conversations"] == []
+
+    @pytest.mark.asyncio
+    async def test_add_file_to_conversation_skips_existing_link(
+        self, test_user: User, test_conversation: Conversation
+    ):
+        """Test linking a file twice succeeds without duplicating the link"""
+        user_file = await db_service.create_user_file(
+            UserFileCreate(**TestDataFactory.user_file_data(test_user.id))
+        )
+
+        assert await db_service.add_file_to_conversation(user_file.id, test_conversation.id)
+        assert await db_service.add_file_to_conversation(user_file.id, test_conversation.id)
+
+        links = await db_service.get_file_conversations(user_file.id)
+        assert [link["conversation_id"] for link in links] == [str(test_conversation.id)]
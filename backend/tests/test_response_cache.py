@@ -0,0 +1,150 @@
+"""
+Tests for the semantic response cache
+"""
+
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.models.database import (
+    Conversation,
+    ConversationTurnBundle,
+    Message,
+    MessageCreate,
+)
+from app.services import ai_service
+from app.services.ai_service import IgnacioAgentService
+from app.services.response_cache import SemanticResponseCache
+
+# Query text -> raw embedding returned by the stubbed embeddings API
+EMBEDDINGS = {
+    "How do I register my company?": [1.0, 0.0, 0.0],
+    "How can I register my company?": [0.99, 0.1, 0.0],
+    "What is a pitch deck?": [0.0, 1.0, 0.0],
+}
+
+
+def _embeddings_client() -> MagicMock:
+    """OpenAI client stub whose embeddings come from EMBEDDINGS"""
+
+    async def create(model: str, input: str):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=EMBEDDINGS[input])])
+
+    client = MagicMock()
+    client.embeddings.create = AsyncMock(side_effect=create)
+    return client
+
+
+@pytest.fixture
+def response_cache() -> SemanticResponseCache:
+    """Semantic cache backed by the stubbed embeddings client"""
+    cache = SemanticResponseCache(threshold=0.92, ttl=60)
+    cache.openai_client = _embeddings_client()
+    return cache
+
+
+class TestSemanticResponseCache:
+    """Test lookups and stores with a stubbed embedder"""
+
+    @pytest.mark.asyncio
+    async def test_similar_question_hits(self, response_cache: SemanticResponseCache):
+        """Test a paraphrased question in the same scope reuses the answer"""
+        miss = await response_cache.lookup("scope", "How do I register my company?")
+        assert miss.response is None
+        response_cache.store(miss, "Use the public registry.")
+
+        hit = await response_cache.lookup("scope", "How can I register my company?")
+
+        assert hit.response == "Use the public registry."
+
+    @pytest.mark.asyncio
+    async def test_different_question_misses(self, response_cache: SemanticResponseCache):
+        """Test an unrelated question is not answered from the cache"""
+        miss = await response_cache.lookup("scope", "How do I register my company?")
+        response_cache.store(miss, "Use the public registry.")
+
+        lookup = await response_cache.lookup("scope", "What is a pitch deck?")
+
+        assert lookup.response is None
+
+    @pytest.mark.asyncio
+    async def test_other_scope_misses(self, response_cache: SemanticResponseCache):
+        """Test entries are kept per scope"""
+        miss = await response_cache.lookup("scope-a", "How do I register my company?")
+        response_cache.store(miss, "Use the public registry.")
+
+        lookup = await response_cache.lookup("scope-b", "How do I register my company?")
+
+        assert lookup.response is None
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_misses(self, response_cache: SemanticResponseCache):
+        """Test entries are not served after their time-to-live"""
+        with patch("app.services.response_cache.time.monotonic", return_value=1000.0):
+            miss = await response_cache.lookup("scope", "How do I register my company?")
+            response_cache.store(miss, "Use the public registry.")
+
+        with patch("app.services.response_cache.time.monotonic", return_value=1060.0):
+            lookup = await response_cache.lookup("scope", "How do I register my company?")
+
+        assert lookup.response is None
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_is_embedded_once(
+        self, response_cache: SemanticResponseCache
+    ):
+        """Test query embeddings are reused instead of re-requested"""
+        for _ in range(3):
+            await response_cache.lookup("scope", "What is a pitch deck?")
+
+        response_cache.openai_client.embeddings.create.assert_awaited_once()
+
+
+class TestCachedTurns:
+    """Test the cache across consecutive turns of continue_conversation"""
+
+    @pytest.mark.asyncio
+    async def test_paraphrase_on_next_turn_hits(self, response_cache: SemanticResponseCache):
+        """Test an answer stored on one persisted turn is served on the next"""
+        conversation_id, user_id = uuid4(), uuid4()
+        now = datetime.now(UTC)
+        conversation = Conversation(
+            id=conversation_id, user_id=user_id, title="Chat", created_at=now, updated_at=now
+        )
+        stored: list[Message] = []
+
+        async def insert_messages(messages: list[MessageCreate]) -> int:
+            for message in messages:
+                stored.append(Message(**{**message.model_dump(), "id": message.id or uuid4()}))
+            return len(messages)
+
+        async def load_turn_bundle(conversation_id, message_limit):
+            # Each turn sees the history persisted by the turns before it
+            return ConversationTurnBundle(
+                conversation=conversation,
+                recent_messages=stored[-message_limit:],
+                message_count=len(stored),
+            )
+
+        run_agent = AsyncMock(return_value="Use the public registry.")
+        with (
+            patch.object(ai_service.db_service, "load_turn_bundle", side_effect=load_turn_bundle),
+            patch.object(ai_service.db_service, "insert_messages", side_effect=insert_messages),
+            patch.object(ai_service, "response_cache", response_cache),
+        ):
+            agent_service = IgnacioAgentService()
+            with patch.object(agent_service, "_run_agent", run_agent):
+                first = await agent_service.continue_conversation(
+                    conversation_id, "How do I register my company?"
+                )
+                second = await agent_service.continue_conversation(
+                    conversation_id, "How can I register my company?"
+                )
+
+        run_agent.assert_awaited_once()
+        assert first.response_text == second.response_text == "Use the public registry."
+        # The cached turn is still stored like any other
+        assert len(stored) == 4